@@ -0,0 +1,90 @@
+// Clientside rendering of the comparison charts (CLIENTSIDE_CHARTS=1).
+//
+// The packed series bundle is loaded once from its hash-named script, which
+// sets window.climateSeriesBundle, and copied into the "series-store" dcc.Store.
+// Country changes then rebuild the chart figures in the browser without a
+// request to the server.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    climate: {
+        loadSeriesStore: function (version) {
+            var bundle = window.climateSeriesBundle;
+            if (!bundle || bundle.hash !== version) {
+                return window.dash_clientside.no_update;
+            }
+            return bundle;
+        },
+
+        comparisonCharts: function (country1, country2, store) {
+            if (!store) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            var values = decodeValues(store);
+            var nCountries = store.countries.length;
+            var nYears = store.years.length;
+
+            function row(seriesIndex, country) {
+                var countryIndex = store.countries.indexOf(country);
+                if (countryIndex < 0) {
+                    return null;
+                }
+                var start = (seriesIndex * nCountries + countryIndex) * nYears;
+                return values.subarray(start, start + nYears);
+            }
+
+            var figures = [];
+            store.charts.forEach(function (chart) {
+                var rows = [row(chart[0], country1), row(chart[0], country2)];
+                var min = Infinity;
+                var max = -Infinity;
+                var counts = rows.map(function (r) {
+                    var count = 0;
+                    if (r) {
+                        for (var i = 0; i < r.length; i++) {
+                            if (!isNaN(r[i])) {
+                                count++;
+                                min = Math.min(min, r[i]);
+                                max = Math.max(max, r[i]);
+                            }
+                        }
+                    }
+                    return count;
+                });
+
+                var yaxis = Object.assign({}, store.layout.yaxis);
+                if (counts[0] || counts[1]) {
+                    yaxis.range = [min, max];
+                }
+                rows.forEach(function (r, j) {
+                    var layout = Object.assign({}, store.layout, {
+                        title: {text: chart[1]},
+                        yaxis: yaxis,
+                    });
+                    if (!counts[j]) {
+                        layout.annotations = [store.noData];
+                    }
+                    var trace = Object.assign({}, store.trace, {
+                        x: store.years,
+                        y: Array.from(r || new Float64Array(nYears).fill(NaN)),
+                    });
+                    figures.push({data: [trace], layout: layout});
+                });
+            });
+            return figures;
+        },
+    },
+});
+
+// Decoded values of the last store, so the base64 payload is decoded once
+var decoded = {hash: null, values: null};
+
+function decodeValues(store) {
+    if (decoded.hash !== store.hash) {
+        var binary = atob(store.values);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        decoded = {hash: store.hash, values: new Float64Array(bytes.buffer)};
+    }
+    return decoded.values;
+}
@@ -0,0 +1,36 @@
+# Background execution of the expensive callbacks
+#
+# The map figures of a wide date window take long enough to build that doing it
+# inside the request would hold a worker thread, and every other user served by
+# that worker, for the whole build. With a background manager, Dash runs such a
+# callback in a separate process and the page polls for its result, so the
+# workers stay free for the cheap comparison callbacks.
+#
+# The manager is the local ``DiskcacheManager``: jobs are forked processes and
+# their results and progress go through a diskcache directory, with no Redis or
+# Celery to run. Results are cached by the callback's input values plus the
+# values of ``cache_by`` (e.g. the version of the data they were built from),
+# and the cache is shared by every worker of the host. BACKGROUND_CALLBACKS
+# turns it on ("1"), off ("0") or on when diskcache is installed ("auto").
+import os
+
+BACKGROUND_CALLBACKS = os.environ.get("BACKGROUND_CALLBACKS", "auto")
+BACKGROUND_CACHE_DIR = os.environ.get("BACKGROUND_CACHE_DIR", os.path.join(".cache", "background"))
+RESULT_EXPIRE = 24 * 3600  # seconds an unused result is kept
+
+
+def manager(cache_by=None, mode=BACKGROUND_CALLBACKS):
+    """The background callback manager, or None to run every callback in the request."""
+    if mode == "0":
+        return None
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+
+        return DiskcacheManager(
+            diskcache.Cache(BACKGROUND_CACHE_DIR), cache_by=cache_by, expire=RESULT_EXPIRE
+        )
+    except ImportError:
+        if mode == "1":
+            raise
+        return None  # "auto" without diskcache, multiprocess and psutil
@@ -0,0 +1,122 @@
+"""Latency of the comparison charts: per-chart mask scans of a long table vs ``SeriesStore``.
+
+The "mask scan" column replays the nine original ``update_charts`` callbacks, the
+"store" column is the fused callback that renders all nine pairs in one pass. The
+fused callback reuses the line traces it built before (see figure_cache.py), so
+it is timed twice: with an empty trace cache before every call ("cold"), and
+with the traces of every pair already cached ("warm").
+
+Run from the repository root, next to the data files:
+
+    python benchmarks/callback_latency.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402  (builds the lookup store)
+from data_loader import load_wide  # noqa: E402
+from figure_cache import TraceCache  # noqa: E402
+
+SERIES = "CO2 emissions (kt)"
+PAIRS = 10  # random country pairs per measurement
+REPEAT = 3
+
+snapshot = main.data.current
+
+# the long (country, series, year) table the callbacks used to scan
+df_flat = load_wide(main.source).drop(columns="Country Code").melt(
+    id_vars=["Country Name", "Series Name"], var_name="Year", value_name="value"
+)
+
+
+def mask_slice(country, series):
+    # the per-request filtering the callbacks used to do
+    filtered_df = df_flat.loc[df_flat["Country Name"] == country]
+    return filtered_df.loc[filtered_df["Series Name"] == series]
+
+
+def mask_callback(country1, country2, series, title):
+    CO2_df = mask_slice(country1, series)
+    CO2_df2 = mask_slice(country2, series)
+    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
+    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
+    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
+    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
+    # as the fused callback does, autoscale when neither country has data
+    range_y = [min(minv + minv2), max(maxv + maxv2)] if minv + minv2 else None
+    figure1 = px.line(CO2_df, x="Year", y="value", title=title, range_y=range_y)
+    figure2 = px.line(CO2_df2, x="Year", y="value", title=title, range_y=range_y)
+    return figure1, figure2
+
+
+def mask_callbacks(country1, country2):
+    # one callback (and one HTTP round trip) per indicator
+    for series, title, _, _ in main.COMPARISON_CHARTS:
+        mask_callback(country1, country2, series, title)
+
+
+def mask_slices(country1, country2):
+    return mask_slice(country1, SERIES), mask_slice(country2, SERIES)
+
+
+def store_slices(country1, country2):
+    return (
+        snapshot.series_store.get(country1, SERIES),
+        snapshot.series_store.get(country2, SERIES),
+    )
+
+
+def store_callback(country1, country2):
+    return main.comparison_charts(country1, country2)
+
+
+def empty_trace_cache():
+    # a fresh cache without the shared backend, so every trace is built again
+    main.trace_cache = TraceCache(maxsize=main.trace_cache.maxsize)
+
+
+def measure(func, pairs, before=None):
+    timings = []
+    for _ in range(REPEAT):
+        for country1, country2 in pairs:
+            if before is not None:
+                before()
+            start = time.perf_counter()
+            func(country1, country2)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e3  # ms per call
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    # countries with data for every charted indicator, or at least for SERIES
+    # in exports that lack some of them
+    charted = [series for series, _, _, _ in main.COMPARISON_CHARTS]
+    candidates = list(snapshot.available_country)
+    _, _, count = snapshot.series_store.stats(candidates, charted)
+    countries = [c for c, n in zip(candidates, count) if n.all()]
+    if len(countries) < 2:
+        countries = [c for c, n in zip(candidates, count[:, charted.index(SERIES)]) if n]
+    pairs = [tuple(rng.sample(countries, 2)) for _ in range(PAIRS)]
+
+    print(f"df_flat rows: {len(df_flat)}, store rows: {len(snapshot.series_store)}")
+    mask_ms = measure(mask_callbacks, pairs)
+    slices = (measure(mask_slices, pairs), measure(store_slices, pairs))
+    cold_ms = measure(store_callback, pairs, before=empty_trace_cache)
+    for country1, country2 in pairs:
+        store_callback(country1, country2)  # caches the traces of every pair
+    rows = [
+        ("slice (2 countries)",) + slices,
+        ("nine pairs, cold", mask_ms, cold_ms),
+        ("nine pairs, warm", mask_ms, measure(store_callback, pairs)),
+    ]
+    print(f"{'':22}{'mask scan':>12}{'store':>12}{'speedup':>10}")
+    for name, old_ms, new_ms in rows:
+        print(f"{name:22}{old_ms:10.3f}ms{new_ms:10.3f}ms{old_ms / new_ms:9.1f}x")
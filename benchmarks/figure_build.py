@@ -0,0 +1,65 @@
+"""CPU cost of building one comparison chart: ``px.line`` vs ``figures``.
+
+Both paths start from the same pre-sliced year/value arrays, so this isolates
+figure construction, the main per-request cost once the data lookups are O(1).
+Pass ``--profile`` to print the top cProfile entries of each path. Run from the
+repository root, next to the data files:
+
+    python benchmarks/figure_build.py [--profile]
+"""
+import cProfile
+import os
+import pstats
+import sys
+import timeit
+
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import figures  # noqa: E402
+import main  # noqa: E402
+
+COUNTRY = "India"
+SERIES = "CO2 emissions (kt)"
+NUMBER = 50
+
+
+def px_chart(years, values):
+    # how the comparison charts were built before figures.py
+    return px.line(
+        x=years,
+        y=values,
+        labels={"x": "Year", "y": "value"},
+        title=SERIES,
+        range_y=[0, 1],
+    ).to_plotly_json()
+
+
+def figures_chart(years, values, trace_type="scatter"):
+    trace = figures.line_trace(years, values, trace_type)
+    return figures.chart_figure(trace, SERIES, [0, 1])
+
+
+if __name__ == "__main__":
+    series_store = main.data.current.series_store
+    years = series_store.years
+    values = series_store.get(COUNTRY, SERIES)
+    paths = [
+        ("px.line", lambda: px_chart(years, values)),
+        ("go.Scatter", lambda: figures_chart(years, values)),
+        ("go.Scattergl", lambda: figures_chart(years, values, "scattergl")),
+    ]
+
+    print(f"{'':14}{'per chart':>12}{'18 charts':>12}")
+    for name, build in paths:
+        build()  # warm up lazily built layouts and templates
+        per_chart = min(timeit.repeat(build, number=NUMBER, repeat=3)) / NUMBER * 1e3
+        print(f"{name:14}{per_chart:10.3f}ms{per_chart * 18:10.1f}ms")
+
+    if "--profile" in sys.argv:
+        for name, build in paths[:2]:
+            print(f"\n{name}:")
+            profiler = cProfile.Profile()
+            profiler.runcall(lambda: [build() for _ in range(NUMBER)])
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(12)
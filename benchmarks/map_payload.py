@@ -0,0 +1,52 @@
+"""Serialized size of the timeline map per window length and frame period.
+
+"px monthly" is the plotly express figure the map used to be, with the full
+locations and hover names repeated in every frame; the other columns are
+``maps.timeline_map_figure`` with monthly, seasonal and yearly frames. Run from
+the repository root, next to TemperatureDataCountryWise.csv:
+
+    python benchmarks/map_payload.py
+"""
+import os
+import sys
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import maps  # noqa: E402
+
+END_DATE = "2012-01-01"
+WINDOW_YEARS = [1, 2, 5, 10, 20]
+
+
+def px_figure(df_countrydate):
+    df_countrydate = df_countrydate.assign(
+        Date=df_countrydate["Date"].dt.strftime("%Y-%m-%d")
+    )
+    return px.choropleth(
+        df_countrydate,
+        locations="Country",
+        locationmode="country names",
+        color="AvTemp",
+        hover_name="Country",
+        animation_frame="Date",
+    )
+
+
+def size_kib(fig):
+    return len(pio.to_json(fig).encode()) / 2**10
+
+
+if __name__ == "__main__":
+    index = maps.temperature_index()
+    periods = list(maps.FRAME_PERIODS)
+    print(f"{'window':>8}{'px monthly':>14}" + "".join(f"{p:>12}" for p in periods))
+    for years in WINDOW_YEARS:
+        start = (pd.Timestamp(END_DATE) - pd.DateOffset(years=years)).strftime("%Y-%m-%d")
+        df_countrydate = index.slice(*index.window(start, END_DATE))
+        sizes = [size_kib(px_figure(df_countrydate))]
+        sizes += [size_kib(maps.timeline_map_figure(df_countrydate, p)) for p in periods]
+        print(f"{years:>7}y" + "".join(f"{size:11.0f}KiB" for size in sizes))
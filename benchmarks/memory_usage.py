@@ -0,0 +1,55 @@
+"""Memory footprint of the indicator table: the long object-column ``df_flat`` vs
+the wide categorical / float64 layout.
+
+Every worker process keeps its own copy of the table, so the saving below is
+per worker. Also times the country equality filter on both layouts. Run from
+the repository root, next to the data files:
+
+    python benchmarks/memory_usage.py [source]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import agg, clean_world_bank, default_source, read_world_bank  # noqa: E402
+
+COUNTRY = "India"
+
+
+def legacy_flat(df_dash):
+    # the object-column pipeline df_flat used to be built with
+    df_newdash = df_dash.drop(["Country Code", "Series Code"], axis=1)
+    df_nonagg = df_newdash[-df_newdash["Country Name"].isin(agg)]
+    df_flat = df_nonagg.melt(
+        id_vars=["Country Name", "Series Name"], var_name="Year", value_name="value"
+    )
+    df_flat[["Year", "NA"]] = df_flat.Year.str.split(" ", expand=True)
+    return df_flat.dropna(axis=0, subset=["Country Name"])
+
+
+def filter_ms(df):
+    def run():
+        return df.loc[df["Country Name"] == COUNTRY]
+
+    best = min(timeit.repeat(run, number=10, repeat=5))
+    return best / 10 * 1e3  # ms per filter
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else default_source()
+    df_dash = read_world_bank(source)
+    layouts = [
+        ("object columns", legacy_flat(df_dash)),
+        ("wide", clean_world_bank(df_dash)),
+    ]
+
+    print(f"{source}: {len(layouts[0][1])} long rows, {len(layouts[1][1])} wide rows")
+    print(f"{'':16}{'memory':>12}{'filter':>12}")
+    for name, df in layouts:
+        memory = df.memory_usage(deep=True).sum() / 2**20
+        print(f"{name:16}{memory:9.2f}MiB{filter_ms(df):10.3f}ms")
+    for name, df in layouts:
+        print(f"\n{name}:")
+        print((df.memory_usage(deep=True) / 2**10).round(1).to_string())
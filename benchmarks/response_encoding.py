@@ -0,0 +1,82 @@
+"""Encode time and bytes per callback response: stdlib json vs orjson, and cached map bytes.
+
+The first table encodes the response of each server callback the way Dash
+does (plotly's JSON encoder) with each engine. The second times the map
+request through Flask's test client, dispatched and encoded by Dash vs
+answered with the cached serialized bytes. Run from the repository root,
+next to the data files:
+
+    python benchmarks/response_encoding.py
+"""
+import os
+import statistics
+import sys
+import time
+
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("PRECOMPUTE_MAPS", "0")
+os.environ.setdefault("BACKGROUND_CALLBACKS", "0")  # the response cache serves synchronous maps
+import main  # noqa: E402
+import maps  # noqa: E402
+
+ENGINES = ["json", "orjson"]
+REPEAT = 20
+
+
+def median_ms(func):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e3
+
+
+def map_request():
+    return {
+        "output": "..world-map-1.figure...world-map-2.figure..",
+        "outputs": [
+            {"id": "world-map-1", "property": "figure"},
+            {"id": "world-map-2", "property": "figure"},
+        ],
+        "inputs": [
+            {"id": "map-dates", "property": "start_date", "value": maps.start_date},
+            {"id": "map-dates", "property": "end_date", "value": maps.end_date},
+            {"id": "map-frames", "property": "value", "value": "month"},
+        ],
+        "changedPropIds": [],
+        "state": [],
+    }
+
+
+if __name__ == "__main__":
+    responses = [
+        ("comparison", main.comparison_charts("India", "Japan")),
+        ("multi", main.update_multi_charts(main.MULTI_DEFAULT_COUNTRIES, None)),
+        ("maps", list(maps.map_figures(maps.start_date, maps.end_date))),
+    ]
+    print(f"{'response':12}" + "".join(f"{engine:>12}{'bytes':>10}" for engine in ENGINES))
+    for name, value in responses:
+        row = f"{name:12}"
+        for engine in ENGINES:
+            ms = median_ms(lambda: pio.json.to_json_plotly(value, engine=engine))
+            size = len(pio.json.to_json_plotly(value, engine=engine).encode())
+            row += f"{ms:10.2f}ms{size / 2**10:7.0f}KiB"
+        print(row)
+
+    client = main.server.test_client()
+    path = main.app.config.routes_pathname_prefix + "_dash-update-component"
+
+    def dispatched():
+        main.map_responses.clear()
+        client.post(path, json=map_request())
+
+    def cached():
+        client.post(path, json=map_request())
+
+    dispatched_ms = median_ms(dispatched)
+    cached_ms = median_ms(cached)
+    print(f"\nmap request: dispatched {dispatched_ms:.2f}ms, cached bytes {cached_ms:.2f}ms")
@@ -0,0 +1,308 @@
+"""Benchmark suite: startup, callback latency, peak memory and payload sizes, as JSON.
+
+Everything runs against ``app.server`` through Flask's test client, without a
+browser:
+
+- startup: wall time of ``import main`` in a fresh process, with a cold and a
+  warm ``.cache``, plus the stages a cold start runs (parsing the exports,
+  cleaning, building the stores, the first figures)
+- callbacks: p50/p99 latency of the ``_dash-update-component`` POST of every
+  server callback over random country pairs and date windows, with the maps
+  built in the request (``BACKGROUND_CALLBACKS=0``) and not ahead of it at
+  startup (``PRECOMPUTE_MAPS=0``)
+- memory: peak RSS of a process that starts the app and serves every callback
+  (``ru_maxrss``, read as KiB as Linux reports it)
+- payloads: serialized size of every callback output
+
+The startup runs happen in a temporary directory that links to the data files,
+so the repository's own cache is left alone. Run from the repository root,
+next to the data files:
+
+    python benchmarks/suite.py [--output results.json] [--samples N]
+    python benchmarks/suite.py --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# the maps are built in the request rather than in a polled background job, so
+# their latency is the build time; no startup thread builds them meanwhile
+# (and fills the response cache) while the startup and callbacks are measured
+os.environ.setdefault("BACKGROUND_CALLBACKS", "0")
+os.environ.setdefault("PRECOMPUTE_MAPS", "0")
+
+SAMPLES = 50  # requests per callback
+SEED = 0
+DATA_FILES = [
+    "climateChangeData_worldBank.xlsx",
+    "climateChangeDataset.csv",
+    "TemperatureDataCountryWise.csv",
+]
+
+# Started in a fresh process: import main, serve each callback once, report
+STARTUP = """
+import json, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, %(root)r)
+import main
+imported = time.perf_counter() - start
+client = main.server.test_client()
+sys.path.insert(0, %(benchmarks)r)
+from suite import callback_requests
+for body in callback_requests(main, 1, 0):
+    client.post("/_dash-update-component", json=body[1])
+print(json.dumps({
+    "import_s": imported,
+    "first_requests_s": time.perf_counter() - start - imported,
+    "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def callback_requests(main, samples, seed):
+    """(callback name, request body) pairs covering every server callback ``samples`` times."""
+    rng = random.Random(seed)
+    countries = [str(country) for country in main.data.current.available_country]
+    dependencies = main.app.server.test_client().get("/_dash-dependencies").get_json()
+    requests = []
+    for dependency in dependencies:
+        if dependency.get("clientside_function"):
+            continue
+        for _ in range(samples):
+            values = random_inputs(main, rng, countries)
+            inputs = [
+                {"id": i["id"], "property": i["property"], "value": values[i["id"], i["property"]]}
+                for i in dependency["inputs"]
+            ]
+            outputs = [
+                {"id": output.split(".")[0], "property": output.split(".")[1]}
+                for output in dependency["output"].strip(".").split("...")
+            ]
+            body = {
+                "output": dependency["output"],
+                "outputs": outputs if len(outputs) > 1 else outputs[0],
+                "inputs": inputs,
+                "changedPropIds": [],
+                "state": [],
+            }
+            requests.append((callback_name(dependency), body))
+    return requests
+
+
+def random_inputs(main, rng, countries):
+    # (component id, property) -> value of every callback input
+    start_year = rng.randint(1900, 2010)
+    return {
+        ("country1", "value"): rng.choice(countries),
+        ("country2", "value"): rng.choice(countries),
+        ("countries", "value"): rng.sample(countries, min(len(countries), rng.randint(1, 20))),
+        ("custom-group", "value"): rng.sample(countries, min(len(countries), rng.randint(0, 5))),
+        ("map-dates", "start_date"): "%d-01-01" % start_year,
+        ("map-dates", "end_date"): "%d-01-01" % (start_year + rng.randint(1, 3)),
+        ("map-frames", "value"): rng.choice(list(main.maps.FRAME_PERIODS)),
+        ("leaderboard-series", "value"): rng.choice(main.data.current.trend_table.series),
+        ("leaderboard-by", "value"): rng.choice(main.trends.RANKED),
+        ("leaderboard-end", "value"): rng.choice(["top", "bottom"]),
+        ("leaderboard-n", "value"): rng.choice([5, 10, 25, 50]),
+        ("panel-x", "value"): rng.choice(main.data.current.series_cube.series),
+        ("panel-y", "value"): rng.choice([main.panel.TEMPERATURE] + main.data.current.series_cube.series),
+        ("panel-size", "value"): rng.choice([None] + main.data.current.series_cube.series),
+        ("panel-year", "value"): int(rng.choice(main.data.current.series_cube.years)),
+    }
+
+
+def callback_name(dependency):
+    first = dependency["output"].strip(".").split("...")[0].split(".")[0]
+    return {
+        "x-time-series": "comparison",
+        "multi-time-series0": "multi",
+        "world-map-1": "maps",
+        "leaderboard": "leaderboard",
+        "panel-scatter": "panel",
+    }.get(first, first)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_startup(cache):
+    # import main in a fresh process inside a scratch directory linked to the data
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in DATA_FILES:
+            if os.path.exists(name):
+                os.symlink(os.path.abspath(name), os.path.join(workdir, name))
+        env = dict(os.environ, DATA_RELOAD_INTERVAL="0")
+        code = STARTUP % {"root": ROOT, "benchmarks": os.path.join(ROOT, "benchmarks")}
+        runs = {}
+        for label in ["cold", "warm"] if cache else ["cold"]:
+            output = subprocess.run(
+                [sys.executable, "-c", code], cwd=workdir, env=env,
+                capture_output=True, text=True, check=True,
+            ).stdout
+            runs[label] = json.loads(output.strip().splitlines()[-1])
+        return runs
+
+
+def startup_stages():
+    """Time each step of a cold start in this process, without any cache."""
+    from data_loader import (
+        TEMPERATURE_SOURCE, clean_world_bank, clean_world_bank_aggregates, default_source,
+        load_temperature, read_world_bank,
+    )
+    from data_store import SeriesCube, SeriesStore
+    from trends import TrendTable
+    import figures
+    import maps
+
+    stages = {}
+
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        stages[name] = time.perf_counter() - start
+        return result
+
+    source = default_source()
+    df_dash = timed("read_world_bank", read_world_bank, source)
+    df_wide = timed("clean_world_bank", clean_world_bank, df_dash)
+    timed("clean_world_bank_aggregates", clean_world_bank_aggregates, df_dash)
+    store = timed("series_store", SeriesStore, df_wide)
+    cube = timed("series_cube", SeriesCube, df_wide)
+    timed("trend_table", TrendTable, cube)
+    df_temperature = timed("load_temperature", load_temperature, TEMPERATURE_SOURCE)
+    index = timed("temperature_index", maps.TemperatureIndex, df_temperature)
+
+    country, series = next(iter(store._rows))
+    timed(
+        "comparison_figure",
+        lambda: figures.chart_figure(
+            figures.line_trace(store.years, store.get(country, series)), series
+        ),
+    )
+    df_window = index.slice(*index.window(maps.start_date, maps.end_date))
+    timed("world_map_figure", lambda: maps.world_map_figure(df_window).to_dict())
+    timed("timeline_map_figure", lambda: maps.timeline_map_figure(df_window).to_dict())
+    return stages
+
+
+def run_callbacks(samples, seed):
+    import main
+
+    client = main.server.test_client()
+    client.get("/")
+    latencies = {}
+    sizes = {}
+    for name, body in callback_requests(main, samples, seed):
+        start = time.perf_counter()
+        response = client.post("/_dash-update-component", json=body)
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if response.status_code != 200:
+            continue  # e.g. PreventUpdate
+        for output_id, props in response.get_json()["response"].items():
+            for prop, value in props.items():
+                size = len(json.dumps(value, separators=(",", ":")))
+                sizes.setdefault("%s.%s" % (output_id, prop), []).append(size)
+
+    callbacks = {
+        name: {
+            "samples": len(values),
+            "p50_ms": percentile(values, 50) * 1e3,
+            "p99_ms": percentile(values, 99) * 1e3,
+            "max_ms": max(values) * 1e3,
+        }
+        for name, values in latencies.items()
+    }
+    payloads = {
+        output: {"median_bytes": statistics.median(values), "max_bytes": max(values)}
+        for output, values in sizes.items()
+    }
+    return callbacks, payloads
+
+
+def environment():
+    import dash
+    import numpy
+    import pandas
+    import plotly
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": {
+            module.__name__: module.__version__ for module in (dash, numpy, pandas, plotly)
+        },
+        "data": {name: os.path.getsize(name) for name in DATA_FILES if os.path.exists(name)},
+    }
+
+
+def compare(old_path, new_path):
+    """Print the relative change of every number shared by two result files."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def numbers(tree, prefix=""):
+        for key, value in tree.items():
+            if key == "environment":
+                continue
+            if isinstance(value, dict):
+                yield from numbers(value, prefix + key + ".")
+            elif isinstance(value, (int, float)):
+                yield prefix + key, value
+
+    old_numbers = dict(numbers(old))
+    print(f"{'':60}{'old':>12}{'new':>12}{'change':>9}")
+    for key, value in numbers(new):
+        if key in old_numbers and old_numbers[key]:
+            change = (value - old_numbers[key]) / old_numbers[key] * 100
+            print(f"{key:60}{old_numbers[key]:12.3f}{value:12.3f}{change:8.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        sys.exit()
+
+    results = {"environment": environment()}
+    results["startup"] = run_startup(cache=True)
+    results["startup"]["stages_s"] = startup_stages()
+    results["callbacks"], results["payloads"] = run_callbacks(args.samples, args.seed)
+    results["memory"] = {
+        "peak_rss_mib": results["startup"]["cold"]["peak_rss_mib"],
+        "this_process_peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    for name, stats in results["callbacks"].items():
+        print(f"{name:12}p50 {stats['p50_ms']:8.2f}ms  p99 {stats['p99_ms']:8.2f}ms")
+    print(f"import: cold {results['startup']['cold']['import_s']:.2f}s, warm {results['startup']['warm']['import_s']:.2f}s")
+    print(f"results written to {args.output}")
@@ -0,0 +1,98 @@
+"""Peak RSS of the temperature ingestion: full ``read_csv`` vs the chunked loader.
+
+The app loads the whole 1743-2013 history once, into the temperature index
+the maps slice (see ``maps.load_index``). "read_csv" is the pipeline main.py
+used to run at import, over the same full history; "chunked" is
+``load_temperature`` with no window, as the index build calls it, and
+"index" adds the ``TemperatureIndex`` arrays built from it. Each loader runs
+in a fresh subprocess so the peaks do not overlap; "imports" is the peak of a
+process that only imports pandas and the loaders, i.e. the floor every
+number shares. Run from the repository root, next to
+TemperatureDataCountryWise.csv:
+
+    python benchmarks/temperature_rss.py
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load_imports():
+    return None
+
+
+def load_full():
+    # the pipeline main.py used to run at import, without its date window
+    import pandas as pd
+
+    df = pd.read_csv("TemperatureDataCountryWise.csv")
+    df = df.drop("AverageTemperatureUncertainty", axis=1)
+    df = df.rename(columns={"dt": "Date"})
+    df = df.rename(columns={"AverageTemperature": "AvTemp"})
+    df = df.dropna()
+    return df.groupby(["Country", "Date"]).sum().reset_index()
+
+
+def load_chunked():
+    from data_loader import load_temperature
+
+    return load_temperature()
+
+
+def load_index():
+    # what a cold ``maps.load_index`` builds and exports; only the temperature
+    # file's own names are resolved, so the World Bank export is not read
+    from countries import CountryTable
+    from data_loader import load_temperature
+    from maps import TemperatureIndex
+
+    arrays, _ = TemperatureIndex(load_temperature(), CountryTable({})).export()
+    return arrays["dates"]
+
+
+LOADERS = {
+    "imports": load_imports,
+    "read_csv": load_full,
+    "chunked": load_chunked,
+    "index": load_index,
+}
+
+
+def peak_rss_mib():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:  # child process: run one loader and report
+        import logging
+
+        import pandas  # noqa: F401  (counted in every mode)
+        import data_loader  # noqa: F401
+        import maps  # noqa: F401
+
+        logging.disable(logging.WARNING)  # the unresolved country names
+
+        start = time.perf_counter()
+        result = LOADERS[sys.argv[1]]()
+        elapsed = time.perf_counter() - start
+        rows = 0 if result is None else len(result)
+        print(f"{peak_rss_mib():.1f} {elapsed:.3f} {rows}")
+        sys.exit(0)
+
+    print(f"{'':10}{'peak RSS':>12}{'time':>10}{'rows':>8}")
+    for mode in LOADERS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), mode],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        peak, elapsed, rows = float(output[0]), float(output[1]), int(output[2])
+        print(f"{mode:10}{peak:9.1f}MiB{elapsed:9.3f}s{rows:8}")
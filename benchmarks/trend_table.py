@@ -0,0 +1,100 @@
+"""Full rebuild of the trend table: vectorized over the cube vs a loop per (series, country).
+
+"vectorized" is ``trends.TrendTable``, built from the (series, country, year)
+cube with array reductions. "loop" computes the same columns one row at a
+time in Python, as a per-country implementation would; the two must agree on
+every value. The leaderboard line times one top-N lookup on the built table.
+Run from the repository root, next to the data files:
+
+    python benchmarks/trend_table.py [source]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import default_source, load_wide  # noqa: E402
+from data_store import SeriesCube  # noqa: E402
+from trends import RANKED, ROLLING_YEARS, TrendTable  # noqa: E402
+
+REPEAT = 5
+LOOKUPS = 200
+
+
+def loop_build(cube):
+    # every column of every (series, country) row, one row at a time
+    years = cube.years
+    columns = {}
+    for i, series in enumerate(cube.series):
+        for j, country in enumerate(cube.countries):
+            values = cube.values[i, j]
+            present = np.flatnonzero(~np.isnan(values))
+            if not len(present):
+                continue
+            first, last = present[0], present[-1]
+            span = years[last] - years[first]
+            cagr = np.nan
+            if span > 0 and values[first] > 0 and values[last] > 0:
+                cagr = ((values[last] / values[first]) ** (1 / span) - 1) * 100
+            slope = np.polyfit(years[present], values[present], 1)[0] if len(present) > 1 else np.nan
+            window = values[max(0, last - ROLLING_YEARS + 1) : last + 1]
+            columns[series, country] = (
+                values[last], years[last], cagr, slope * 10, np.nanmean(window)
+            )
+    # rank by latest value within each series, tied values sharing the best rank
+    for series in cube.series:
+        rows = sorted(
+            (key for key in columns if key[0] == series), key=lambda key: -columns[key][0]
+        )
+        rank = 0
+        for position, key in enumerate(rows, 1):
+            if position == 1 or columns[key][0] != columns[previous][0]:
+                rank = position
+            columns[key] += (rank,)
+            previous = key
+    return columns
+
+
+def check(table, columns):
+    """Assert that the vectorized table holds the loop's columns, and nothing else."""
+    names = ["latest", "latest_year", "cagr", "decade_change", "rolling_mean", "rank"]
+    assert np.count_nonzero(~np.isnan(table.columns["latest"])) == len(columns)
+    for (series, country), expected in columns.items():
+        i, j = table.series.index(series), table.countries.index(country)
+        actual = [table.columns[name][i, j] for name in names]
+        assert np.allclose(actual, expected, rtol=1e-6, equal_nan=True), (series, country)
+
+
+def best_of(func, *args):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e3, result  # ms
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else default_source()
+    cube = SeriesCube(load_wide(source))
+    vectorized_ms, table = best_of(TrendTable, cube)
+    loop_ms, columns = best_of(loop_build, cube)
+    check(table, columns)
+
+    rng = random.Random(0)
+    timings = []
+    for _ in range(LOOKUPS):
+        series, by, n = rng.choice(table.series), rng.choice(RANKED), rng.choice([5, 10, 25, 50])
+        start = time.perf_counter()
+        table.leaderboard(series, by, n, bottom=rng.random() < 0.5)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{source}: {len(cube.series)} series x {len(cube.countries)} countries x {len(cube.years)} years")
+    print(f"{'':24}{'loop':>12}{'vectorized':>14}{'speedup':>10}")
+    print(f"{'full rebuild':24}{loop_ms:10.2f}ms{vectorized_ms:12.2f}ms{loop_ms / vectorized_ms:9.1f}x")
+    print(f"leaderboard lookup: median {statistics.median(timings) * 1e3:.3f}ms")
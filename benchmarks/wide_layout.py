@@ -0,0 +1,104 @@
+"""Load and per-request time of the melted long table vs the wide year-column table.
+
+"melt" is the pipeline the dashboard used to run: melt the "1960 [YR1960]"
+columns into long form, split every Year string and filter the long table
+per country and series on each request. "wide" parses the year headers once,
+keeps one float64 row per (country, series) and answers a request with row
+lookups in ``SeriesStore``. Parsing the export itself is shared by both and
+reported on its own. Run from the repository root, next to the data files:
+
+    python benchmarks/wide_layout.py [source]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import agg, clean_world_bank, default_source, read_world_bank  # noqa: E402
+from data_store import SeriesStore  # noqa: E402
+
+SERIES = [
+    "CO2 emissions (kt)",
+    "Methane emissions (kt of CO2 equivalent)",
+    "Total greenhouse gas emissions (kt of CO2 equivalent)",
+]
+PAIRS = 20  # random country pairs per measurement
+REPEAT = 5
+
+
+def melt_load(df_dash):
+    # the long df_flat table the dashboard used to build at startup
+    df_newdash = df_dash.drop(["Country Code", "Series Code"], axis=1)
+    df_nonagg = df_newdash[-df_newdash["Country Name"].isin(agg)]
+    df_flat = df_nonagg.melt(
+        id_vars=["Country Name", "Series Name"], var_name="Year", value_name="value"
+    )
+    df_flat[["Year", "NA"]] = df_flat.Year.str.split(" ", expand=True)
+    return df_flat.dropna(axis=0, subset=["Country Name"])
+
+
+def wide_load(df_dash):
+    return SeriesStore(clean_world_bank(df_dash))
+
+
+def melt_request(df_flat, country1, country2):
+    # year/value arrays of every series for both countries, filtered per request
+    result = []
+    for country in (country1, country2):
+        filtered_df = df_flat.loc[df_flat["Country Name"] == country]
+        for series in SERIES:
+            rows = filtered_df.loc[filtered_df["Series Name"] == series]
+            result.append((rows["Year"].to_numpy(), rows["value"].to_numpy()))
+    return result
+
+
+def wide_request(store, country1, country2):
+    return [
+        (store.years, store.get(country, series))
+        for country in (country1, country2)
+        for series in SERIES
+    ]
+
+
+def best_of(func, *args):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e3, result  # ms
+
+
+def median_request(func, table, pairs):
+    timings = []
+    for _ in range(REPEAT):
+        for country1, country2 in pairs:
+            start = time.perf_counter()
+            func(table, country1, country2)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e3  # ms per request
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else default_source()
+    read_ms, df_dash = best_of(read_world_bank, source)
+    melt_ms, df_flat = best_of(melt_load, df_dash)
+    wide_ms, store = best_of(wide_load, df_dash)
+
+    rng = random.Random(0)
+    countries = sorted({country for country, _ in store._rows})
+    pairs = [tuple(rng.sample(countries, 2)) for _ in range(PAIRS)]
+    melt_request_ms = median_request(melt_request, df_flat, pairs)
+    wide_request_ms = median_request(wide_request, store, pairs)
+
+    print(f"{source}: parsed in {read_ms:.1f}ms, {len(df_flat)} long rows, {len(store)} wide rows")
+    print(f"{'':30}{'melt':>12}{'wide':>12}{'speedup':>10}")
+    print(f"{'load (after parsing)':30}{melt_ms:10.2f}ms{wide_ms:10.2f}ms{melt_ms / wide_ms:9.1f}x")
+    print(
+        f"{'request (2 x %d series)' % len(SERIES):30}"
+        f"{melt_request_ms:10.3f}ms{wide_request_ms:10.3f}ms"
+        f"{melt_request_ms / wide_request_ms:9.1f}x"
+    )
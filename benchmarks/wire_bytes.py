@@ -0,0 +1,101 @@
+"""Bytes on the wire per page load and per interaction, uncompressed vs gzip vs brotli.
+
+A page load is the index page, the scripts it links, the layout, the callback
+graph and one request of every server callback; a reload sends the ETags of
+the first load back and gets 304s for whatever did not change. An interaction
+is one callback request with random inputs (see ``suite.callback_requests``).
+Everything goes through Flask's test client, which returns the bytes as sent.
+Run from the repository root, next to the data files:
+
+    python benchmarks/wire_bytes.py [--samples N]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+os.environ.setdefault("BACKGROUND_CALLBACKS", "0")  # callbacks answer in the request
+os.environ.setdefault("PRECOMPUTE_MAPS", "0")  # no map build running alongside
+import main  # noqa: E402
+from suite import callback_requests  # noqa: E402
+
+ENCODINGS = ["identity", "gzip", "br"]
+UPDATE_PATH = "/_dash-update-component"
+
+
+def page_load(client, encoding, etags=None):
+    """Bytes of every request of a page load, and the ETags of its GETs."""
+    headers = {"Accept-Encoding": encoding}
+    etags = etags or {}
+    sizes = {}
+    new_etags = {}
+
+    def get(path):
+        response = client.get(path, headers=dict(headers, **{"If-None-Match": etags.get(path, "")}))
+        sizes[path] = len(response.get_data())
+        new_etags[path] = response.headers.get("ETag", "")
+        return response
+
+    get("/")
+    index = client.get("/").get_data(as_text=True)  # uncompressed, for its script tags
+    for path in re.findall(r'<script src="(/[^"]+)"', index):
+        get(path)
+    get("/_dash-layout")
+    get("/_dash-dependencies")
+    for name, body in callback_requests(main, 1, 0):
+        response = client.post(UPDATE_PATH, json=body, headers=headers)
+        sizes["callback %s" % name] = len(response.get_data())
+    return sizes, new_etags
+
+
+def interactions(client, encoding, samples):
+    sizes = {}
+    for name, body in callback_requests(main, samples, 1):
+        response = client.post(UPDATE_PATH, json=body, headers={"Accept-Encoding": encoding})
+        sizes.setdefault(name, []).append(len(response.get_data()))
+    return sizes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+    client = main.server.test_client()
+
+    print(f"{'KiB':28}" + "".join(f"{encoding:>12}" for encoding in ENCODINGS) + f"{'br reload':>12}")
+    loads = {encoding: page_load(client, encoding) for encoding in ENCODINGS}
+    reload_sizes, _ = page_load(client, "br", loads["br"][1])
+    rows = {
+        "page load": {encoding: sum(sizes.values()) for encoding, (sizes, _) in loads.items()},
+        "  scripts": {
+            encoding: sum(size for path, size in sizes.items() if path.endswith(".js"))
+            for encoding, (sizes, _) in loads.items()
+        },
+        "  layout": {encoding: sizes["/_dash-layout"] for encoding, (sizes, _) in loads.items()},
+    }
+    reloaded = {
+        "page load": sum(reload_sizes.values()),
+        "  scripts": sum(size for path, size in reload_sizes.items() if path.endswith(".js")),
+        "  layout": reload_sizes["/_dash-layout"],
+    }
+    for label, sizes in rows.items():
+        print(
+            f"{label:28}"
+            + "".join(f"{sizes[encoding] / 2**10:12.1f}" for encoding in ENCODINGS)
+            + f"{reloaded[label] / 2**10:12.1f}"
+        )
+
+    per_encoding = {encoding: interactions(client, encoding, args.samples) for encoding in ENCODINGS}
+    for name in per_encoding["identity"]:
+        print(
+            f"{'interaction ' + name + ' (median)':28}"
+            + "".join(
+                f"{statistics.median(per_encoding[encoding][name]) / 2**10:12.1f}"
+                for encoding in ENCODINGS
+            )
+        )
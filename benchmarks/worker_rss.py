@@ -0,0 +1,80 @@
+"""Memory per worker against the number of workers: shared memory maps vs private copies.
+
+Starts N worker processes that each import ``main`` and serve one comparison
+and one map request, then reads their memory from /proc (Linux only). "rss"
+counts every resident page of a worker, shared or not; "pss" splits each
+shared page between the processes mapping it, so it is what a worker really
+adds to the host. In "copies" mode every worker copies the mapped arrays into
+private memory, as each worker used to hold its own dataframes. Run from the
+repository root, next to the data files:
+
+    python benchmarks/worker_rss.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKERS = [1, 2, 4, 8]
+
+WORKER = """
+import sys
+import numpy as np
+sys.path.insert(0, %(root)r)
+import main
+
+main.comparison_charts("India", "Japan")
+main.maps.map_figures(main.maps.start_date, main.maps.end_date)
+if %(copies)r:
+    for holder in (main.data.current.series_store, main.data.current.series_cube, main.maps.temperature.current):
+        for name, value in list(vars(holder).items()):
+            if isinstance(value, np.memmap):
+                setattr(holder, name, np.array(value))
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def memory_mib(pid):
+    # Rss / Pss / Private_* lines of the process, in MiB
+    fields = {}
+    with open("/proc/%d/smaps_rollup" % pid) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return fields["Rss"], fields["Pss"]
+
+
+def measure(workers, copies):
+    env = dict(os.environ, DATA_RELOAD_INTERVAL="0")
+    code = WORKER % {"root": ROOT, "copies": copies}
+    processes = []
+    try:
+        for _ in range(workers):
+            process = subprocess.Popen(
+                [sys.executable, "-c", code],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=env,
+                text=True,
+            )
+            processes.append(process)
+            process.stdout.readline()  # one at a time, so only the first builds the files
+        usage = [memory_mib(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    rss = sum(u[0] for u in usage) / workers
+    pss = sum(u[1] for u in usage) / workers
+    return rss, pss, sum(u[1] for u in usage)
+
+
+if __name__ == "__main__":
+    print(f"{'workers':>8}{'mode':>8}{'rss/worker':>14}{'pss/worker':>14}{'pss total':>14}")
+    for workers in WORKERS:
+        for mode, copies in (("mapped", False), ("copies", True)):
+            rss, pss, total = measure(workers, copies)
+            print(f"{workers:>8}{mode:>8}{rss:11.1f}MiB{pss:11.1f}MiB{total:11.1f}MiB")
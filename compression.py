@@ -0,0 +1,61 @@
+# Compression and conditional GETs of the responses
+#
+# Every response above COMPRESS_MIN_SIZE bytes (the layout, the figure
+# payloads of the callbacks, the scripts) is compressed with brotli, or gzip
+# for clients that do not accept it, through Flask-Compress. GET responses also
+# carry an ETag made from the hash of their content, and a request whose
+# If-None-Match already names that content is answered with an empty 304: a
+# page reload revalidates the layout instead of downloading it again.
+#
+# The hooks must be installed before any other after_request hook that reads
+# the response body (metrics, the response cache), since Flask runs them in
+# reverse order and the compression has to be the last one.
+import hashlib
+import os
+
+import flask
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))  # bytes
+COMPRESS_ALGORITHMS = ["br", "gzip"]
+COMPRESS_MIMETYPES = [
+    "text/html",
+    "text/css",
+    "application/json",
+    "application/javascript",
+    "text/javascript",  # how newer Dash releases serve the component scripts
+]
+
+
+def install(server, min_size=COMPRESS_MIN_SIZE):
+    """Compress the responses of ``server`` and answer conditional GETs with 304."""
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        Compress = None  # responses go out uncompressed
+    if Compress is not None:
+        server.config.setdefault("COMPRESS_MIN_SIZE", min_size)
+        server.config.setdefault("COMPRESS_ALGORITHM", COMPRESS_ALGORITHMS)
+        server.config.setdefault("COMPRESS_MIMETYPES", COMPRESS_MIMETYPES)
+        Compress(server)
+
+    # registered after Compress, so it runs first, on the uncompressed body
+    @server.after_request
+    def conditional_get(response):
+        request = flask.request
+        if (
+            request.method not in ("GET", "HEAD")
+            or response.status_code != 200
+            or response.direct_passthrough  # files, which have their own validators
+            or "ETag" in response.headers
+        ):
+            return response
+        etag = hashlib.sha256(response.get_data()).hexdigest()[:32]
+        response.set_etag(etag)
+        response.headers.setdefault("Cache-Control", "no-cache")  # revalidate on every load
+        # Flask-Compress tags the compressed variants "<etag>:br" and "<etag>:gzip"
+        known = {tag.split(":")[0] for tag in request.if_none_match.as_set(include_weak=True)}
+        if etag in known or request.if_none_match.star_tag:
+            response.status_code = 304
+            response.set_data(b"")
+            response.headers.pop("Content-Length", None)
+        return response
@@ -0,0 +1,133 @@
+# Canonical country table keyed by ISO 3166-1 alpha-3 code
+#
+# The World Bank export carries the ISO-3 code of every country in its
+# ``Country Code`` column, and the Berkeley Earth temperature file only has
+# country names, some of which are spelled differently ("Russia", "Burma",
+# "Congo (Democratic Republic Of The)"). The table maps both sets of names to
+# one code: World Bank names through the export, Berkeley Earth names through
+# the same names or ``TEMPERATURE_ALIASES``. The maps are drawn with
+# ``locationmode="ISO-3"`` from these codes, so plotly does not resolve names,
+# and a name that resolves to no code is reported instead of silently lost.
+import logging
+
+from data_loader import default_source, load_wide, shared_arrays
+
+logger = logging.getLogger(__name__)
+
+# Berkeley Earth names that differ from the World Bank names: name -> ISO-3 code
+TEMPERATURE_ALIASES = {
+    "Åland": "ALA",
+    "Anguilla": "AIA",
+    "Antarctica": "ATA",
+    "Antigua And Barbuda": "ATG",
+    "Bahamas": "BHS",
+    "Bonaire, Saint Eustatius And Saba": "BES",
+    "Bosnia And Herzegovina": "BIH",
+    "Brunei": "BRN",
+    "Burma": "MMR",
+    "Cape Verde": "CPV",
+    "Christmas Island": "CXR",
+    "Congo": "COG",
+    "Congo (Democratic Republic Of The)": "COD",
+    "Curaçao": "CUW",
+    "Czech Republic": "CZE",
+    "Côte D'Ivoire": "CIV",
+    "Egypt": "EGY",
+    "Falkland Islands (Islas Malvinas)": "FLK",
+    "Federated States Of Micronesia": "FSM",
+    "French Guiana": "GUF",
+    "French Southern And Antarctic Lands": "ATF",
+    "Gambia": "GMB",
+    "Guadeloupe": "GLP",
+    "Guernsey": "GGY",
+    "Guinea Bissau": "GNB",
+    "Heard Island And Mcdonald Islands": "HMD",
+    "Hong Kong": "HKG",
+    "Iran": "IRN",
+    "Isle Of Man": "IMN",
+    "Jersey": "JEY",
+    "Kyrgyzstan": "KGZ",
+    "Laos": "LAO",
+    "Macau": "MAC",
+    "Macedonia": "MKD",
+    "Martinique": "MTQ",
+    "Mayotte": "MYT",
+    "Montserrat": "MSR",
+    "Niue": "NIU",
+    "North Korea": "PRK",
+    "Palestina": "PSE",
+    "Reunion": "REU",
+    "Russia": "RUS",
+    "Saint Barthélemy": "BLM",
+    "Saint Kitts And Nevis": "KNA",
+    "Saint Lucia": "LCA",
+    "Saint Martin": "MAF",
+    "Saint Pierre And Miquelon": "SPM",
+    "Saint Vincent And The Grenadines": "VCT",
+    "Sao Tome And Principe": "STP",
+    "Sint Maarten": "SXM",
+    "Slovakia": "SVK",
+    "South Georgia And The South Sandwich Isla": "SGS",
+    "South Korea": "KOR",
+    "Svalbard And Jan Mayen": "SJM",
+    "Swaziland": "SWZ",
+    "Syria": "SYR",
+    "Taiwan": "TWN",
+    "Timor Leste": "TLS",
+    "Trinidad And Tobago": "TTO",
+    "Turks And Caicos Islands": "TCA",
+    "Venezuela": "VEN",
+    "Virgin Islands": "VIR",
+    "Western Sahara": "ESH",
+    "Yemen": "YEM",
+}
+
+# Berkeley Earth series that are not a country of their own: continents,
+# mainland-only duplicates of a country and islands without an ISO-3 code
+NOT_COUNTRIES = {
+    "Africa",
+    "Asia",
+    "Europe",
+    "North America",
+    "Oceania",
+    "South America",
+    "Denmark (Europe)",
+    "France (Europe)",
+    "Netherlands (Europe)",
+    "United Kingdom (Europe)",
+    "Gaza Strip",
+    "Baker Island",
+    "Kingman Reef",
+    "Palmyra Atoll",
+}
+
+
+class CountryTable:
+    """ISO-3 code of every World Bank and Berkeley Earth country name."""
+
+    def __init__(self, codes_by_name):
+        self._codes = dict(TEMPERATURE_ALIASES)
+        self._codes.update(codes_by_name)  # the export's own names and codes first
+
+    def resolve(self, names):
+        """ISO-3 codes of ``names`` (None where there is none), logging the unknown countries."""
+        codes = [self._codes.get(name) for name in names]
+        unknown = sorted(
+            name for name, code in zip(names, codes) if code is None and name not in NOT_COUNTRIES
+        )
+        if unknown:
+            logger.warning("no ISO-3 code for %d countries: %s", len(unknown), ", ".join(unknown))
+        return codes
+
+
+def load_country_table(source=None):
+    """The country table of the World Bank export ``source``, cached with its arrays."""
+    source = source or default_source()
+    _, meta = shared_arrays(source, "countries", lambda: ({}, country_codes(load_wide(source))))
+    return CountryTable(meta)
+
+
+def country_codes(df_wide):
+    """Country name -> ISO-3 code of the countries of the cleaned wide table."""
+    pairs = df_wide[["Country Name", "Country Code"]].drop_duplicates("Country Name")
+    return {str(name): str(code) for name, code in zip(pairs["Country Name"], pairs["Country Code"])}
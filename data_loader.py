@@ -0,0 +1,350 @@
+# Loading and cleaning of the World Bank indicator data, with a columnar cache,
+# and streaming ingestion of the Berkeley Earth temperature data
+#
+# Parsing the xlsx export through openpyxl is by far the slowest part of startup,
+# so the cleaned tables (the countries and the aggregated regions) are built
+# from one parse and each written to a compact ``.npz`` file (integer codes plus
+# a dictionary per categorical column, one float64 array per year); every later
+# start, in every worker process, loads those instead. The caches are rebuilt
+# only when the source file changes.
+#
+# Arrays that every worker process would otherwise hold its own copy of (the
+# indicator lookup arrays and the temperature index) are written once as plain
+# ``.npy`` files and mapped read-only by each worker, so they are shared through
+# the OS page cache; see ``shared_arrays``.
+#
+# Build (or refresh) the cache ahead of deployment with:
+#
+#     python data_loader.py [climateChangeData_worldBank.xlsx | climateChangeDataset.csv]
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Sources tried in order when none is given: the full xlsx export, then the csv
+# export that ships with the repository
+DEFAULT_SOURCES = ["climateChangeData_worldBank.xlsx", "climateChangeDataset.csv"]
+TEMPERATURE_SOURCE = "TemperatureDataCountryWise.csv"
+TEMPERATURE_CHUNKSIZE = 100_000  # rows parsed at a time
+CACHE_DIR = ".cache"
+CACHE_VERSION = 5  # bump when the layout of the cached table changes
+
+# aggregated regions and income groups that are not countries
+agg = [
+    "Africa Eastern and Southern",
+    "Africa Western and Central",
+    "Arab World",
+    "Caribbean small states",
+    "Central Europe and the Baltics",
+    "Early-demographic dividend",
+    "East Asia & Pacific",
+    "East Asia & Pacific (excluding high income)",
+    "East Asia & Pacific (IDA & IBRD countries)",
+    "Euro area",
+    "Europe & Central Asia",
+    "Europe & Central Asia (excluding high income)",
+    "Europe & Central Asia (IDA & IBRD countries)",
+    "European Union",
+    "Fragile and conflict affected situations",
+    "Heavily indebted poor countries (HIPC)",
+    "High income",
+    "IBRD only",
+    "IDA & IBRD total",
+    "IDA blend",
+    "IDA only",
+    "IDA total",
+    "Late-demographic dividend",
+    "Latin America & Caribbean",
+    "Latin America & Caribbean (excluding high income)",
+    "Latin America & the Caribbean (IDA & IBRD countries)",
+    "Least developed countries: UN classification",
+    "Low & middle income",
+    "Low income",
+    "Lower middle income",
+    "Middle East & North Africa",
+    "Middle East & North Africa (excluding high income)",
+    "Middle East & North Africa (IDA & IBRD countries)",
+    "Middle income",
+    "North America",
+    "Not classified",
+    "OECD members",
+    "Other small states",
+    "Pacific island small states",
+    "Post-demographic dividend",
+    "Pre-demographic dividend",
+    "Small states",
+    "South Asia",
+    "South Asia (IDA & IBRD)",
+    "Sub-Saharan Africa",
+    "Sub-Saharan Africa (excluding high income)",
+    "Sub-Saharan Africa (IDA & IBRD countries)",
+    "Upper middle income",
+    "World",
+]
+
+
+def default_source():
+    """Return the first of ``DEFAULT_SOURCES`` that exists."""
+    for source in DEFAULT_SOURCES:
+        if os.path.exists(source):
+            return source
+    raise FileNotFoundError("none of %s found" % ", ".join(DEFAULT_SOURCES))
+
+
+def read_world_bank(source):
+    """Read a World Bank DataBank export (xlsx or csv) as is."""
+    if source.lower().endswith(".csv"):
+        return pd.read_csv(source, na_values="..", encoding="utf-8-sig")
+    return pd.read_excel(source, na_values="..")
+
+
+def clean_world_bank(df_dash):
+    """Clean the export, keeping its wide layout: one row per (country, series).
+
+    Country and series names are categoricals and the "1960 [YR1960]" headers
+    are parsed once into integer year columns of float64 values, so a
+    (country, series) selection is a row lookup rather than a scan of a long
+    melted table. The ISO-3 ``Country Code`` is kept next to the name (see
+    countries.py). The aggregated regions in ``agg`` are left out.
+    """
+    df_newdash = df_dash.drop(["Series Code"], axis=1) # drop the columns
+    df_nonagg = df_newdash[-df_newdash["Country Name"].isin(agg)] # drop the rows with aggregated countries
+    return _wide_table(df_nonagg)
+
+
+def clean_world_bank_aggregates(df_dash):
+    """The rows of the aggregated regions in ``agg``, in the same wide layout."""
+    df_newdash = df_dash.drop(["Series Code"], axis=1) # drop the columns
+    return _wide_table(df_newdash[df_newdash["Country Name"].isin(agg)]) # keep only the aggregates
+
+
+def _wide_table(df_rows):
+    df_rows = df_rows.dropna(axis=0, subset=["Country Name"]) # drop the rows with NaN
+    df_rows = df_rows.rename(
+        columns=lambda column: int(column.split(" ")[0]) if column[:4].isdigit() else column
+    ) # "1960 [YR1960]" -> 1960, parsed once per column instead of once per row
+    years = [column for column in df_rows.columns if isinstance(column, int)]
+    df_wide = df_rows[years].astype(np.float64)
+    df_wide.insert(0, "Series Name", df_rows["Series Name"].astype("category"))
+    df_wide.insert(0, "Country Code", df_rows["Country Code"].astype("category"))
+    df_wide.insert(0, "Country Name", df_rows["Country Name"].astype("category"))
+    return df_wide.reset_index(drop=True)
+
+
+# Cleaned tables that can be cached: kind -> cleaning function
+CLEANERS = {"wide": clean_world_bank, "aggregates": clean_world_bank_aggregates}
+
+
+def load_temperature(source=TEMPERATURE_SOURCE, chunksize=TEMPERATURE_CHUNKSIZE):
+    """Stream the full history of monthly country temperatures.
+
+    The file is read ``chunksize`` rows at a time with the columns and dtypes
+    pinned, and the rows without a temperature or a country are dropped from
+    every chunk as it is parsed. Country names are made categorical chunk by
+    chunk, so the 1743-2013 history is never held as one string object per
+    row. Returns ``Date`` (datetime64), ``AvTemp`` and ``Country``
+    (categorical) columns.
+    """
+    chunks = []
+    names = []
+    reader = pd.read_csv(
+        source,
+        usecols=["dt", "AverageTemperature", "Country"],
+        dtype={"dt": str, "AverageTemperature": np.float64, "Country": str},
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        date = pd.to_datetime(chunk["dt"], format="%Y-%m-%d")
+        mask = chunk["AverageTemperature"].notna() & chunk["Country"].notna()
+        chunks.append(
+            pd.DataFrame({"Date": date[mask], "AvTemp": chunk["AverageTemperature"][mask]})
+        )
+        names.append(chunk["Country"][mask].astype("category"))
+
+    df = pd.concat(chunks, ignore_index=True)
+    df["Country"] = union_categoricals(names, sort_categories=True)
+    return df
+
+
+def load_wide(source=None, cache_dir=CACHE_DIR):
+    """Return the cleaned wide table (one row per country and series), from the cache when it is up to date."""
+    return load_cleaned("wide", source, cache_dir)
+
+
+def load_aggregates(source=None, cache_dir=CACHE_DIR):
+    """Return the wide table of the aggregated regions, cached like the country table."""
+    return load_cleaned("aggregates", source, cache_dir)
+
+
+def load_cleaned(kind, source=None, cache_dir=CACHE_DIR):
+    """Return the cleaned table of ``kind`` (see ``CLEANERS``), rebuilding the caches if stale."""
+    source = source or default_source()
+    cache_path = _cache_path(source, kind, cache_dir)
+    stat = os.stat(source)
+
+    meta = _read_cache_meta(cache_path)
+    if meta is not None:
+        if (meta["size"], meta["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return _load_cache(cache_path)
+        if meta["sha256"] == _sha256(source):  # touched but not modified
+            return _load_cache(cache_path)
+
+    return build_cache(source, cache_dir)[kind]
+
+
+def build_cache(source, cache_dir=CACHE_DIR):
+    """Parse ``source`` once and (re)write the columnar cache of every kind in ``CLEANERS``.
+
+    Returns the cleaned tables by kind.
+    """
+    df_dash = read_world_bank(source)
+    tables = {}
+    for kind, clean in CLEANERS.items():
+        tables[kind] = clean(df_dash)
+        _write_cache(source, kind, tables[kind], cache_dir)
+    return tables
+
+
+def _write_cache(source, kind, df, cache_dir):
+    stat = os.stat(source)
+    meta = {
+        "version": CACHE_VERSION,
+        "source": os.path.basename(source),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _sha256(source),
+        "columns": list(df.columns),
+    }
+    arrays = {"meta": np.array(json.dumps(meta))}
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = df[column].cat.categories
+            arrays["%s.codes" % column] = df[column].cat.codes.to_numpy()
+            arrays["%s.categories" % column] = np.asarray(categories, dtype=str)
+        else:
+            arrays[str(column)] = df[column].to_numpy()
+
+    cache_path = _cache_path(source, kind, cache_dir)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = "%s.%d.tmp" % (cache_path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, cache_path)  # atomic, so concurrent workers never read half a file
+
+
+def shared_arrays(source, kind, build, cache_dir=CACHE_DIR):
+    """Return read-only memory maps of the arrays derived from ``source``, and their metadata.
+
+    ``build()`` returns (dict of name -> ndarray, JSON-serializable metadata)
+    and is only called when the files of the current version of ``source`` are
+    missing: the first process writes them and every other worker maps the
+    same files instead of building its own copy. Files of other versions are
+    removed after a rebuild; processes that still map them keep their pages.
+    """
+    stat = os.stat(source)
+    version = "%d-%d-%d" % (CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+    prefix = os.path.join(cache_dir, "%s.%s" % (os.path.basename(source), kind))
+
+    meta = _read_json("%s.json" % prefix)
+    if meta is not None and meta["version"] == version:
+        try:
+            return _map_arrays(prefix, meta), meta["meta"]
+        except OSError:
+            pass  # replaced by a newer version in the meantime
+
+    arrays, extra = build()
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, array in arrays.items():
+        path = "%s.%s.%s.npy" % (prefix, version, name)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, path)
+    meta = {"version": version, "arrays": list(arrays), "meta": extra}
+    tmp_path = "%s.json.%d.tmp" % (prefix, os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, "%s.json" % prefix)  # written last, once every array is in place
+
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if path.startswith(prefix + ".") and path.endswith(".npy") and version not in name:
+            try:
+                os.remove(path)  # an older version
+            except OSError:
+                pass
+    return _map_arrays(prefix, meta), extra
+
+
+def _map_arrays(prefix, meta):
+    arrays = {}
+    for name in meta["arrays"]:
+        path = "%s.%s.%s.npy" % (prefix, meta["version"], name)
+        try:
+            arrays[name] = np.load(path, mmap_mode="r")
+        except ValueError:  # empty arrays cannot be mapped
+            arrays[name] = np.load(path)
+    return arrays
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # missing or unreadable
+
+
+def _load_cache(cache_path):
+    with np.load(cache_path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        columns = {}
+        for column in meta["columns"]:
+            if "%s.codes" % column in data:
+                columns[column] = pd.Categorical.from_codes(
+                    data["%s.codes" % column], data["%s.categories" % column].astype(object)
+                )
+            else:
+                columns[column] = data[str(column)]
+    return pd.DataFrame(columns, columns=meta["columns"])
+
+
+def _read_cache_meta(cache_path):
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+    except (OSError, KeyError, ValueError):
+        return None  # missing or unreadable cache
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return meta
+
+
+def _cache_path(source, kind, cache_dir):
+    return os.path.join(cache_dir, "%s.%s.npz" % (os.path.basename(source), kind))
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else default_source()
+    for kind, df in build_cache(source).items():
+        print("cached %d rows of %s in %s" % (len(df), source, _cache_path(source, kind, CACHE_DIR)))
+
+    # the memory-mapped arrays the workers share
+    import maps
+    from snapshot import DataSnapshot
+
+    DataSnapshot(source)
+    maps.load_index()
+    print("mapped the lookup arrays of %s and %s" % (source, TEMPERATURE_SOURCE))
@@ -0,0 +1,166 @@
+# Lookup store for the World Bank indicator series shown in the comparison charts
+import base64
+
+import numpy as np
+
+
+class SeriesStore:
+    """Year arrays for every (country, series) pair, built once from the wide table.
+
+    Each row of the cleaned World Bank table already is one (country, series)
+    over every year, so its year columns are taken as a single float64 matrix
+    and a lookup is a dict hit followed by a contiguous row view.
+    """
+
+    def __init__(self, df_wide):
+        df_wide = df_wide.drop_duplicates(["Country Name", "Series Name"])
+        year_columns = sorted(column for column in df_wide.columns if isinstance(column, int))
+
+        self.years = np.array(year_columns)  # shared year axis for every series
+        values = df_wide[year_columns].to_numpy(dtype=np.float64)
+        missing = np.full((1, len(self.years)), np.nan)  # last row, for unknown pairs
+        self.values = np.ascontiguousarray(np.vstack([values, missing]))
+        self.values.flags.writeable = False  # rows are handed out as views
+        keys = zip(df_wide["Country Name"], df_wide["Series Name"])
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+        # per-(country, series) value range, in the same row order as ``values``
+        self.minv = np.fmin.reduce(self.values, axis=1)
+        self.maxv = np.fmax.reduce(self.values, axis=1)
+        self.count = np.count_nonzero(~np.isnan(self.values), axis=1)
+
+    def export(self):
+        """The arrays and JSON metadata ``from_export`` rebuilds this store from."""
+        arrays = {
+            "years": self.years,
+            "values": self.values,
+            "minv": self.minv,
+            "maxv": self.maxv,
+            "count": self.count,
+        }
+        return arrays, {"keys": [list(key) for key in self._rows]}
+
+    @classmethod
+    def from_export(cls, arrays, meta):
+        """Store over already built arrays, e.g. read-only memory maps shared by the workers."""
+        store = cls.__new__(cls)
+        for name, array in arrays.items():
+            setattr(store, name, array)
+        store._rows = {tuple(key): row for row, key in enumerate(meta["keys"])}
+        return store
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, country, series):
+        """Return the values of ``series`` for ``country``, aligned with ``self.years``.
+
+        Pairs that are not in the dataset come back as an all-NaN row.
+        """
+        return self.values[self._rows.get((country, series), -1)]
+
+    def stats(self, countries, series):
+        """Return the precomputed (min, max, count) of each series for each country.
+
+        Each array has shape (len(countries), len(series)); pairs without any
+        data have a count of 0 and a NaN min/max.
+        """
+        rows = self._row_indices(countries, series)
+        return self.minv[rows], self.maxv[rows], self.count[rows]
+
+    def pack(self, countries, series):
+        """Dense (series, country, year) block of values for shipping to the browser.
+
+        The float64 values are sent as little-endian bytes in base64, with NaN
+        for missing years, alongside the axes needed to index them.
+        """
+        block = self.values[self._row_indices(countries, series).T]
+        return {
+            "countries": [str(country) for country in countries],
+            "series": list(series),
+            "years": self.years.tolist(),
+            "values": base64.b64encode(block.astype("<f8").tobytes()).decode("ascii"),
+        }
+
+    def _row_indices(self, countries, series):
+        return np.array(
+            [
+                [self._rows.get((country, name), -1) for name in series]
+                for country in countries
+            ],
+            dtype=np.intp,
+        )
+
+
+class SeriesCube:
+    """Dense (series, country, year) array of every indicator, built from the wide table.
+
+    Each row of the wide World Bank layout already holds one (country, series)
+    across all years, so the cube is filled with a single scatter assignment
+    and no melt. Selecting any number of countries and series is one fancy
+    index, and their ranges are reductions over the year axis.
+    """
+
+    def __init__(self, df_wide):
+        countries = df_wide["Country Name"].astype("category").cat
+        series = df_wide["Series Name"].astype("category").cat
+        year_columns = [column for column in df_wide.columns if isinstance(column, int)]
+
+        self.countries = list(countries.categories)
+        self.series = list(series.categories)
+        self.years = np.array(year_columns)
+        self._country_index = {name: i for i, name in enumerate(self.countries)}
+        self._series_index = {name: i for i, name in enumerate(self.series)}
+
+        # the extra last country is all NaN and stands in for unknown names
+        values = np.full((len(self.series), len(self.countries) + 1, len(self.years)), np.nan)
+        values[series.codes, countries.codes] = df_wide[year_columns].to_numpy(dtype=np.float64)
+        self.values = values
+        self.values.flags.writeable = False
+
+    def export(self):
+        """The arrays and JSON metadata ``from_export`` rebuilds this cube from."""
+        arrays = {"years": self.years, "values": self.values}
+        return arrays, {"countries": self.countries, "series": self.series}
+
+    @classmethod
+    def from_export(cls, arrays, meta):
+        """Cube over already built arrays, e.g. a read-only memory map shared by the workers."""
+        cube = cls.__new__(cls)
+        cube.years = arrays["years"]
+        cube.values = arrays["values"]
+        cube.countries = list(meta["countries"])
+        cube.series = list(meta["series"])
+        cube._country_index = {name: i for i, name in enumerate(cube.countries)}
+        cube._series_index = {name: i for i, name in enumerate(cube.series)}
+        return cube
+
+    def __contains__(self, country):
+        return country in self._country_index
+
+    def slice(self, countries, series):
+        """Return the (len(series), len(countries), len(self.years)) block of values."""
+        country_rows = [self._country_index.get(name, -1) for name in countries]
+        series_rows = [self._series_index.get(name, -1) for name in series]
+        if not series_rows or not country_rows:
+            return np.empty((len(series_rows), len(country_rows), len(self.years)))
+        block = self.values[np.ix_(series_rows, country_rows)]
+        block[:, [row == -1 for row in country_rows]] = np.nan  # unknown countries
+        block[[row == -1 for row in series_rows]] = np.nan  # unknown series
+        return block
+
+    @staticmethod
+    def ranges(block):
+        """Shared (min, max, count) of each series over every country in ``block``."""
+        flat = block.reshape(block.shape[0], -1)
+        if flat.shape[1] == 0:
+            empty = np.full(block.shape[0], np.nan)
+            return empty, empty, np.zeros(block.shape[0], dtype=np.int64)
+        return (
+            np.fmin.reduce(flat, axis=1),
+            np.fmax.reduce(flat, axis=1),
+            np.count_nonzero(~np.isnan(flat), axis=1),
+        )
@@ -0,0 +1,62 @@
+# Server-side cache of the per-country line traces behind the comparison charts
+import threading
+from collections import OrderedDict
+
+
+class TraceCache:
+    """Bounded, thread-safe LRU cache of serialized traces keyed by (country, series).
+
+    Building a trace costs far more than slicing its data, and the same popular
+    comparisons are requested over and over, so each (country, series) trace is
+    built once and reused; layout and shared y-range are applied per response.
+
+    ``backend`` is an optional Flask-Caching ``Cache`` consulted on a local
+    miss, e.g. a ``FileSystemCache`` shared by every worker on the host.
+    """
+
+    def __init__(self, maxsize=512, backend=None):
+        self.maxsize = maxsize
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the cached value of ``key``, calling ``build()`` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = self.backend.get(self._backend_key(key)) if self.backend else None
+        if value is None:
+            value = build()  # built outside the lock so other keys are not blocked
+            if self.backend:
+                self.backend.set(self._backend_key(key), value)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)  # evict the least recently used
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    @staticmethod
+    def _backend_key(key):
+        return "trace:" + "\x1f".join(key)
@@ -0,0 +1,154 @@
+# Lightweight figure construction for the comparison charts
+#
+# plotly express runs its whole dataframe validation and grouping machinery to
+# draw a single ~62 point line, and the comparison callback draws 18 of them.
+# The charts here are built from the pre-sliced year/value arrays as one
+# go.Scatter trace each, and the layout of every indicator is built once and
+# only gets its y-axis range applied per response.
+import functools
+import hashlib
+import json
+
+import numpy as np
+import plotly.graph_objs as go
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+# "scattergl" draws with WebGL, but browsers cap the number of live WebGL
+# contexts well below the 18 charts on the page, so SVG is the default
+TRACE_TYPES = {"scatter": go.Scatter, "scattergl": go.Scattergl}
+
+NO_DATA_ANNOTATION = dict(
+    text="No data available", showarrow=False, xref="paper", yref="paper", x=0.5, y=0.5
+)
+
+
+def line_trace(years, values, trace_type="scatter"):
+    """Serialized line trace of ``values`` over ``years``, styled as px.line draws it."""
+    trace = TRACE_TYPES[trace_type](
+        x=years,
+        y=values,
+        mode="lines",
+        line=dict(color="#636efa", dash="solid"),
+        hovertemplate="Year=%{x}<br>value=%{y}<extra></extra>",
+        showlegend=False,
+    )
+    return trace.to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def chart_layout(title):
+    """Serialized layout of an indicator's chart, without the y-axis range."""
+    layout = go.Layout(
+        template=pio.templates[pio.templates.default],
+        title=dict(text=title),
+        xaxis=dict(title=dict(text="Year")),
+        yaxis=dict(title=dict(text="value")),
+        legend=dict(tracegroupgap=0),
+        margin=dict(t=60),
+    )
+    return layout.to_plotly_json()
+
+
+def chart_figure(trace, title, range_y=None, has_data=True):
+    """Figure dict of one chart from a cached trace and the indicator's layout.
+
+    The layout dict is shared between responses, so only copies of it are
+    modified here.
+    """
+    layout = chart_layout(title)
+    yaxis = dict(layout.get("yaxis", {}))
+    if range_y is not None:
+        yaxis["range"] = [float(range_y[0]), float(range_y[1])]
+    layout = dict(layout, yaxis=yaxis)
+    if not has_data:
+        layout["annotations"] = [NO_DATA_ANNOTATION]
+    return {"data": [trace], "layout": layout}
+
+
+def multi_country_figure(years, values, countries, title, range_y=None):
+    """Figure dict of one indicator for any number of countries.
+
+    ``values`` is the (len(countries), len(years)) block of the indicator. The
+    traces are plain dicts (no per-trace validation) that take their colours
+    from the template's colorway, one legend entry per country.
+    """
+    hovertemplate = "Country=%s<br>Year=%%{x}<br>value=%%{y}<extra></extra>"
+    traces = [
+        {
+            "type": "scatter",
+            "x": years,
+            "y": row,
+            "mode": "lines",
+            "name": country,
+            "hovertemplate": hovertemplate % country,
+        }
+        for country, row in zip(countries, values)
+    ]
+    figure = chart_figure(None, title, range_y, range_y is not None)
+    figure["data"] = traces
+    return figure
+
+
+def scatter_figure(x, y, countries, titles, size=None, size_max=None, ranges=(None, None)):
+    """Figure dict of one marker per country at (``x``, ``y``), a bubble chart with ``size``.
+
+    ``titles`` are the (x, y) axis titles and ``ranges`` their fixed ranges.
+    Countries without an x or y value are left out; a missing size draws the
+    smallest bubble. Bubbles are scaled by ``size_max`` so they keep their
+    scale when the values change.
+    """
+    keep = ~(np.isnan(x) | np.isnan(y))
+    marker = {"color": "#636efa"}
+    if size is not None:
+        marker.update(
+            size=np.nan_to_num(np.clip(size[keep], 0, None)),
+            sizemode="area",
+            sizeref=2.0 * (size_max or 1) / 40**2,  # the largest bubble is 40px across
+            sizemin=3,
+        )
+    trace = {
+        "type": "scatter",
+        "x": x[keep],
+        "y": y[keep],
+        "text": [country for country, kept in zip(countries, keep) if kept],
+        "mode": "markers",
+        "marker": marker,
+        "hovertemplate": "<b>%{text}</b><br>x=%{x}<br>y=%{y}<extra></extra>",
+        "showlegend": False,
+    }
+    layout = dict(chart_layout(""))
+    for axis, title, range_ in zip(("xaxis", "yaxis"), titles, ranges):
+        layout[axis] = dict(layout.get(axis, {}), title=dict(text=title))
+        if range_ is not None:
+            margin = (range_[1] - range_[0]) * 0.05 or 1
+            layout[axis]["range"] = [range_[0] - margin, range_[1] + margin]
+    if not keep.any():
+        layout["annotations"] = [NO_DATA_ANNOTATION]
+    return {"data": [trace], "layout": layout}
+
+
+def clientside_bundle(series_store, countries, charts):
+    """Everything the browser needs to draw the comparison charts by itself.
+
+    ``charts`` are the (series name, chart title, ...) entries of the page. The
+    bundle holds the packed values of the distinct series plus the trace and
+    layout templates, and is named by the hash of its content so it can be
+    served as an immutable, cacheable asset. Returns (hash, JSON text).
+    """
+    series = list(dict.fromkeys(chart[0] for chart in charts))
+    trace = line_trace([], [])
+    del trace["x"], trace["y"]
+    layout = dict(chart_layout(""))
+    del layout["title"]
+
+    bundle = series_store.pack(countries, series)
+    bundle.update(
+        charts=[[series.index(chart[0]), chart[1]] for chart in charts],
+        trace=trace,
+        layout=layout,
+        noData=NO_DATA_ANNOTATION,
+    )
+    text = json.dumps(bundle, cls=PlotlyJSONEncoder, separators=(",", ":"))
+    digest = hashlib.sha256(text.encode()).hexdigest()[:16]
+    return digest, text
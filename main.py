@@ -1,139 +1,208 @@
 # import the required libraries
+import json
+import os
+import threading
 from logging import logThreads
+
 import dash
+import flask
 import numpy as np
-import pandas as pd
 import plotly as py
-import plotly.express as px
-import plotly.graph_objs as go
-from dash import dcc, html
-
-df = pd.read_csv("TemperatureDataCountryWise.csv")  # read the csv file
-df = df.drop("AverageTemperatureUncertainty", axis=1)  # drop the column
-df = df.rename(columns={"dt": "Date"})  # rename the column
-df = df.rename(columns={"AverageTemperature": "AvTemp"})  # rename the column
-df = df.dropna()  # drop the rows with NaN
-df_countries = (
-    df.groupby(["Country", "Date"])
-    .sum()
-    .reset_index()
-    .sort_values("Date", ascending=False)
-)  # group the data by country and date
-
-# Masking by data range
-start_date = "2000-01-01"  # start date
-end_date = "2002-01-01"  # end date
-mask = (df_countries["Date"] > start_date) & (
-    df_countries["Date"] <= end_date
-)  # mask the data
-df_countries = df_countries.loc[mask]
-
-fig = go.Figure(
-    data=go.Choropleth(
-        locations=df_countries["Country"],
-        locationmode="country names",
-        z=df_countries["AvTemp"],
-        colorscale="Reds",
-        marker_line_color="black",
-        marker_line_width=0.5,
-    )
-)
-fig.update_layout(
-    title_text="Climate Change",
-    title_x=0.5,
-    geo=dict(showframe=False, showcoastlines=False, projection_type="equirectangular"),
-)
+from dash import dash_table, dcc, html
+from dash.dash_table.Format import Format, Group, Scheme
+from flask_caching import Cache
+
+import background
+import compression
+from data_loader import default_source
+from data_store import SeriesCube
+from figure_cache import TraceCache
+import figures
+import maps
+import metrics
+import panel
+import serialization
+import trends
+from snapshot import RELOAD_INTERVAL, DataSnapshot, SnapshotHolder, watch
 
+external_stylesheets = ["dash_design.css"]
 
-# Climate change by timeline
-# Manipulating the original dataframe
-df_countrydate = df_countries.groupby(["Date", "Country"]).sum().reset_index()
-# Creating the visualization
-fig2 = px.choropleth(
-    df_countrydate,
-    locations="Country",
-    locationmode="country names",
-    color="AvTemp",
-    hover_name="Country",
-    animation_frame="Date",
-)
-fig2.update_layout(
-    title_text="Average Temperature Change",
-    title_x=0.5,
-    geo=dict(
-        showframe=False,
-        showcoastlines=False,
-    ),
-)
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
+server = app.server
 
+# brotli/gzip compression of the responses and ETags with 304s for repeated
+# GETs (see compression.py); installed first, so it sees the final responses
+compression.install(server)
+
+# Optional Flask-Caching store behind the in-process trace cache, e.g.
+# CACHE_TYPE=FileSystemCache CACHE_DIR=/tmp/dashboard-traces to share the built
+# traces between the workers of a host, or CACHE_TYPE=SimpleCache
+cache = None
+if os.environ.get("CACHE_TYPE"):
+    cache = Cache(
+        server,
+        config={
+            "CACHE_TYPE": os.environ["CACHE_TYPE"],
+            "CACHE_DIR": os.environ.get("CACHE_DIR", os.path.join(".cache", "traces")),
+            "CACHE_DEFAULT_TIMEOUT": 0,
+        },
+    )
+trace_cache = TraceCache(maxsize=512, backend=cache) # (data version, country, series) -> line trace
+
+# Per-callback stage timings and output sizes, served at /metrics (see metrics.py)
+metrics.instrument(server, app.config.routes_pathname_prefix + "_dash-update-component")
+
+
+def trace_cache_metrics():
+    stats = trace_cache.stats()
+    return "\n".join(
+        [
+            "# HELP dashboard_trace_cache_requests_total Line trace cache lookups.",
+            "# TYPE dashboard_trace_cache_requests_total counter",
+            'dashboard_trace_cache_requests_total{result="hit"} %d' % stats["hits"],
+            'dashboard_trace_cache_requests_total{result="miss"} %d' % stats["misses"],
+            "# HELP dashboard_trace_cache_size Line traces currently cached.",
+            "# TYPE dashboard_trace_cache_size gauge",
+            "dashboard_trace_cache_size %d" % stats["size"],
+        ]
+    )
 
-external_stylesheets = ["dash_design.css"]
 
-agg = [
-    "Arab World",
-    "Caribbean small states",
-    "Central Europe and the Baltics",
-    "Early-demographic dividend",
-    "East Asia & Pacific",
-    "East Asia & Pacific (excluding high income)",
-    "East Asia & Pacific (IDA & IBRD countries)",
-    "Euro area",
-    "Europe & Central Asia",
-    "Europe & Central Asia (excluding high income)",
-    "Europe & Central Asia (IDA & IBRD countries)",
-    "European Union",
-    "Fragile and conflict affected situations",
-    "Heavily indebted poor countries (HIPC)",
-    "High income",
-    "IBRD only",
-    "IDA & IBRD total",
-    "IDA blend",
-    "IDA only",
-    "IDA total",
-    "Late-demographic dividend",
-    "Latin America & Caribbean",
-    "Latin America & Caribbean (excluding high income)",
-    "Latin America & the Caribbean (IDA & IBRD countries)",
-    "Least developed countries: UN classification",
-    "Low & middle income",
-    "Low income",
-    "Lower middle income",
-    "Middle East & North Africa",
-    "Middle East & North Africa (excluding high income)",
-    "Middle East & North Africa (IDA & IBRD countries)",
-    "Middle income",
-    "North America",
-    "Not classified",
-    "OECD members",
-    "Other small states",
-    "Pacific island small states",
-    "Post-demographic dividend",
-    "Pre-demographic dividend",
-    "Small states",
-    "South Asia",
-    "South Asia (IDA & IBRD)",
-    "Sub-Saharan Africa",
-    "Sub-Saharan Africa (excluding high income)",
-    "Sub-Saharan Africa (IDA & IBRD countries)",
-    "Upper middle income",
-    "World",
-]
+metrics.collectors.append(trace_cache_metrics)
 
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
-server = app.server
+# The map figures are built in background processes when a background manager
+# is available (BACKGROUND_CALLBACKS, see background.py), with their results
+# cached per input values and temperature data version
+background_manager = background.manager(cache_by=[maps.temperature_version])
+
+# Callback responses are encoded with orjson when it is installed (JSON_ENGINE),
+# and the serialized map responses are kept for repeated requests
+serialization.configure()
+map_responses = serialization.ResponseCache(
+    maxsize=maps.MAP_CACHE_SIZE, version=maps.temperature_version, name="maps"
+)
+map_responses.install(server, app.config.routes_pathname_prefix + "_dash-update-component")
+
+# data Cleaning and processing, served from the columnar cache when the source is
+# unchanged. The callbacks read the current snapshot of the data, which a watcher
+# thread rebuilds and swaps in when the export changes (DATA_RELOAD_INTERVAL
+# seconds between checks, 0 to turn it off)
+source = default_source()
+data = SnapshotHolder(lambda: DataSnapshot(source), [source])
+
+RELOAD_SECONDS = float(os.environ.get("DATA_RELOAD_INTERVAL", RELOAD_INTERVAL))
+if RELOAD_SECONDS > 0:
+    watch([data, maps.temperature], RELOAD_SECONDS)
+
+# Indicators shown side-by-side for the two selected countries:
+# (series name, chart title, graph id for country1, graph id for country2)
+COMPARISON_CHARTS = [
+    ("CO2 emissions (kt)", "CO2 emissions (kt)", "x-time-series", "y-time-series"),
+    (
+        "Methane emissions (kt of CO2 equivalent)",
+        "Methane emissions (kt of CO2 equivalent)",
+        "x-time-series1",
+        "y-time-series1",
+    ),
+    (
+        "Total greenhouse gas emissions (kt of CO2 equivalent)",
+        "GreenHouse gas emissions (kt of CO2 equivalent)",
+        "x-time-series2",
+        "y-time-series2",
+    ),
+    (
+        "Electricity production from oil, gas and coal sources (% of total)",
+        "Electricity production from oil, gas and coal sources",
+        "x-time-series3",
+        "y-time-series3",
+    ),
+    (
+        "Electricity production from renewable sources, excluding hydroelectric (kWh)",
+        "Electricity production from renewable sources, excluding hydroelectric (kWh)",
+        "x-time-series4",
+        "y-time-series4",
+    ),
+    (
+        "Other greenhouse gas emissions, HFC, PFC and SF6 (thousand metric tons of CO2 equivalent)",
+        "Other greenhouse gas emissions, HFC, PFC and SF6",
+        "x-time-series5",
+        "y-time-series5",
+    ),
+    (
+        "Total greenhouse gas emissions (kt of CO2 equivalent)",
+        "Total greenhouse gas emissions (kt of CO2 equivalent)",
+        "x-time-series6",
+        "y-time-series6",
+    ),
+    (
+        "Population density (people per sq. km of land area)",
+        "Population density (people per sq. km of land area)",
+        "x-time-series7",
+        "y-time-series7",
+    ),
+    (
+        "Fossil fuel energy consumption (% of total)",
+        "Fossil fuel energy consumption (% of total)",
+        "x-time-series8",
+        "y-time-series8",
+    ),
+]
 
-# data Cleaning and processing
-climateChangeData = "climateChangeData_worldBank.xlsx" # read the csv file
-df_dash = pd.read_excel(climateChangeData, na_values="..") 
-df_newdash = df_dash.drop(["Country Code", "Series Code"], axis=1) # drop the columns
-df_nonagg = df_newdash[-df_newdash["Country Name"].isin(agg)] # drop the rows with aggregated countries
-df_flat = df_nonagg.melt(
-    id_vars=["Country Name", "Series Name"], var_name="Year", value_name="value"
-) # melt the dataframe
-df_flat[["Year", "NA"]] = df_flat.Year.str.split(" ", expand=True) # split the year column
-df_flat = df_flat.dropna(axis=0, subset=["Country Name"]) # drop the rows with NaN
+# Indicators of the N-country comparison: every distinct series above, once,
+# as (series name, chart title)
+MULTI_CHARTS = {}
+for series_name, title, _, _ in COMPARISON_CHARTS:
+    MULTI_CHARTS.setdefault(series_name, title)
+MULTI_CHARTS = list(MULTI_CHARTS.items())
+MULTI_DEFAULT_COUNTRIES = ["India", "Japan", "China", "United States", "Brazil"]
+
+# Leaderboard of the countries of one indicator, ordered by a column of the
+# trend table (see trends.py)
+LEADERBOARD_SIZE = 10
+LEADERBOARD_COLUMNS = [{"name": "Country", "id": "country"}]
+for name, label in trends.COLUMNS.items():
+    column = {"name": label, "id": name, "type": "numeric"}
+    if name not in ("latest_year", "rank"):
+        column["format"] = Format(precision=2, scheme=Scheme.fixed, group=Group.yes)
+    LEADERBOARD_COLUMNS.append(column)
+
+
+# Scatter explorer of the joined temperature x indicator panel (see panel.py);
+# its year slider starts at the year of the maps' default window
+PANEL_X = "CO2 emissions (kt)"
+PANEL_SIZE = "Population, total"
+PANEL_DEFAULT_YEAR = int(maps.end_date[:4]) - 1
+
+
+# Clientside mode: the comparison charts are drawn in the browser from a packed
+# copy of their series, so country changes need no server round trip. The
+# bundle is built from the data loaded at startup and is not hot-reloaded
+CLIENTSIDE_CHARTS = os.environ.get("CLIENTSIDE_CHARTS") == "1"
+clientside_stores = []
+if CLIENTSIDE_CHARTS:
+    series_bundle_hash, series_bundle = figures.clientside_bundle(
+        data.current.series_store, data.current.available_country, COMPARISON_CHARTS
+    )
+    series_bundle_js = "window.climateSeriesBundle = Object.assign(%s, {hash: %s});" % (
+        series_bundle,
+        json.dumps(series_bundle_hash),
+    )
+    app.config.external_scripts.append(
+        "%s_dash-series/%s.js" % (app.config.requests_pathname_prefix, series_bundle_hash)
+    )
+    clientside_stores = [
+        dcc.Store(id="series-version", data=series_bundle_hash),
+        dcc.Store(id="series-store"),
+    ]
 
-available_country = df_flat["Country Name"].unique()
+    # The bundle's URL changes with its content, so browsers may cache it for good
+    @server.route(app.config.routes_pathname_prefix + "_dash-series/<digest>.js")
+    def series_bundle_asset(digest):
+        if digest != series_bundle_hash:
+            flask.abort(404)
+        response = flask.Response(series_bundle_js, mimetype="application/javascript")
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
 
 
 # Dash Core Component - Dropdown and Graph is being used where Time-series graph will update based on country selected
@@ -147,667 +216,554 @@ available_country = df_flat["Country Name"].unique()
 # 4. plotly plots of the climateChangeData
 # 5. the climate change plot of the World
 # 6. the temperature change plot of the World
-app.layout = html.Div(
-    children=[
-        html.H1(
-            children="Climate Change Dashboard",
-            style={
-                "font-family": "monospace",
-                "font-size": "50px",
-                "textAlign": "center",
-                "color": "#874356",
-                "backgroundColor": "#FAEDF0",
-            },
-        ),
-        html.Div(
-            children="""
-
-      Select two countries from the dropdown menu for comparative study side-by-side
+# the world maps are left empty here and filled in by a callback for the date
+# range picked above them, which keeps the initial layout payload small
+# the layout is built per page load from the current data snapshot
+def serve_layout():
+    snapshot = data.current
+    available_country = snapshot.available_country
+    return html.Div(
+        children=clientside_stores
+        + [
+            html.H1(
+                children="Climate Change Dashboard",
+                style={
+                    "font-family": "monospace",
+                    "font-size": "50px",
+                    "textAlign": "center",
+                    "color": "#874356",
+                    "backgroundColor": "#FAEDF0",
+                },
+            ),
+            html.Div(
+                children="""
+
+          Select two countries from the dropdown menu for comparative study side-by-side
       
-      """,
-            style={
-                "textAlign": "center",
-                "font-size": "22px",
-                "font-family": "arial",
-                "color": "#C65D7B",
-            },
-        ),
-        html.Div(
-            [
-                html.Div(
-                    [
-                        dcc.Dropdown(
-                            id="country1",
-                            options=[
-                                {"label": i, "value": i} for i in available_country
-                            ],
-                            value="India",
-                            clearable=False,
-                        )
-                    ],
-                    style={
-                        "width": "49%",
-                        "display": "inline-block",
-                        "backgroundColor": "#676FA3",
-                    },
-                ),
-                html.Div(
-                    [
-                        dcc.Dropdown(
-                            id="country2",
-                            options=[
-                                {"label": i, "value": i} for i in available_country
-                            ],
-                            value="Japan",
-                            clearable=False,
-                        )
-                    ],
-                    style={"width": "49%", "display": "inline-block"},
-                ),
-            ],
-            style={
-                "borderBottom": "thin lightgrey solid",
-                "backgroundColor": "#676FA3",
-                "padding": "10px 5px",
-            },
-        ),
-        html.Div(
-            [
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series1")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series1")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series2")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series2")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series3")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series3")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series4")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series4")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series5")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series5")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series6")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series6")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series7")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series7")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-                html.Div(
-                    [
-                        html.Div(
-                            [dcc.Graph(id="x-time-series8")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                        html.Div(
-                            [dcc.Graph(id="y-time-series8")],
-                            style={"width": "49%", "display": "inline-block"},
-                        ),
-                    ],
-                    style={
-                        "borderBottom": "thin lightgrey solid",
-                        "backgroundColor": "#676FA3",
-                        "padding": "10px 5px",
-                    },
-                ),
-            ]
-        ),
-        html.Br(),
-        html.Br(),
-        html.H1(
-            children="World Map Plots ",
-            style={
-                "font-family": "monospace",
-                "font-size": "42px",
-                "backgroundColor": "#FAEDF0",
-                "textAlign": "center",
-                "color": "#874356",
-            },
-        ),
-        html.Br(),
-        html.Br(),
-        html.Div(
-            [dcc.Graph(id="world-map-1", figure=fig)],
-            style={
-                "width": "90%",
-                "display": "inline-block",
-                "backgroundColor": "#FAEDF0",
-            },
-        ),
-        html.Br(),
-        html.Div(
-            [dcc.Graph(id="world-map-2", figure=fig2)],
-            style={
-                "width": "90%",
-                "display": "inline-block",
-                "backgroundColor": "#FAEDF0",
-            },
-        ),
-    ]
-)
-
-
-# Define the callback which is responsible for the interactivity in the graph,
-# Input value is from the dropdown and output is the time series chart
-@app.callback(
-    dash.dependencies.Output("x-time-series", "figure"),
-    dash.dependencies.Output("y-time-series", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
-)
-# Below code defines the function that will create a dataframe and a time series graph based on country selected in the dropdown.
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1] # Filter the dataframe based on the country selected in the dropdown
-
-    CO2_df = filtered_df.loc[filtered_df["Series Name"] == "CO2 emissions (kt)"] # Filter the dataframe based on the series name
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist() # Get the max value from the dataframe
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist() # Get the min value from the dataframe
-
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2] # Filter the dataframe based on the country selected in the dropdown
-    CO2_df2 = filtered_df2.loc[filtered_df2["Series Name"] == "CO2 emissions (kt)"] # Filter the dataframe based on the series name
-
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist() # Get the max value from the dataframe
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist() # Get the min value from the dataframe
-
-    maxva2 = max(maxv + maxv2) # Get the max value from the two countries
-    minva2 = min(minv + minv2) # Get the min value from the two countries
-
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="CO2 emissions (kt)",
-        range_y=[minva2, maxva2],
-    ) # Create a time series graph based on the CO2 emissions dataframe
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="CO2 emissions (kt)",
-        range_y=[minva2, maxva2],
-    ) # Create a time series graph based on the CO2 emissions dataframe
-    return figure1, figure2
-
-# similar for other plots Below
-
-@app.callback(
-    dash.dependencies.Output("x-time-series1", "figure"),
-    dash.dependencies.Output("y-time-series1", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
-)
-# Different code to find min,max values
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1] # Filtered dataframe for country1
-
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"] == "Methane emissions (kt of CO2 equivalent)"
-    ] # Filtered dataframe for methane emissions
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist() # Max value for methane emissions
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist() # Min value for methane emissions
-
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2] # Filtered dataframe for country2
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"] == "Methane emissions (kt of CO2 equivalent)"
-    ] # Filtered dataframe for methane emissions
-
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist() # Max value for methane emissions
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist() # Min value for methane emissions
-
-    maxva2 = max(maxv + maxv2) # Max value for methane emissions
-    minva2 = min(minv + minv2)  # Min value for methane emissions
-
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="Methane emissions (kt of CO2 equivalent)",
-        range_y=[minva2, maxva2], 
-    ) # Time series graph for methane emissions
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="Methane emissions (kt of CO2 equivalent)",
-        range_y=[minva2, maxva2],
-    ) # Time series graph for methane emissions
-    return figure1, figure2
-
-
-@app.callback(
-    dash.dependencies.Output("x-time-series2", "figure"),
-    dash.dependencies.Output("y-time-series2", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
-)
-# Different code to find min,max values
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1]
-
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"]
-        == "Total greenhouse gas emissions (kt of CO2 equivalent)"
-    ]
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
-
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2]
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"]
-        == "Total greenhouse gas emissions (kt of CO2 equivalent)"
-    ]
-
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
-
-    maxva2 = max(maxv + maxv2)
-    minva2 = min(minv + minv2)
-
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="GreenHouse gas emissions (kt of CO2 equivalent)",
-        range_y=[minva2, maxva2],
-    )
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="GreenHouse gas emissions (kt of CO2 equivalent)",
-        range_y=[minva2, maxva2],
+          """,
+                style={
+                    "textAlign": "center",
+                    "font-size": "22px",
+                    "font-family": "arial",
+                    "color": "#C65D7B",
+                },
+            ),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            dcc.Dropdown(
+                                id="country1",
+                                options=[
+                                    {"label": i, "value": i} for i in available_country
+                                ],
+                                value="India",
+                                clearable=False,
+                            )
+                        ],
+                        style={
+                            "width": "49%",
+                            "display": "inline-block",
+                            "backgroundColor": "#676FA3",
+                        },
+                    ),
+                    html.Div(
+                        [
+                            dcc.Dropdown(
+                                id="country2",
+                                options=[
+                                    {"label": i, "value": i} for i in available_country
+                                ],
+                                value="Japan",
+                                clearable=False,
+                            )
+                        ],
+                        style={"width": "49%", "display": "inline-block"},
+                    ),
+                ],
+                style={
+                    "borderBottom": "thin lightgrey solid",
+                    "backgroundColor": "#676FA3",
+                    "padding": "10px 5px",
+                },
+            ),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            html.Div(
+                                [dcc.Graph(id=graph1)],
+                                style={"width": "49%", "display": "inline-block"},
+                            ),
+                            html.Div(
+                                [dcc.Graph(id=graph2)],
+                                style={"width": "49%", "display": "inline-block"},
+                            ),
+                        ],
+                        style={
+                            "borderBottom": "thin lightgrey solid",
+                            "backgroundColor": "#676FA3",
+                            "padding": "10px 5px",
+                        },
+                    )
+                    for _, _, graph1, graph2 in COMPARISON_CHARTS
+                ]
+            ),
+            html.Br(),
+            html.Div(
+                children="""
+
+          Select any number of countries, regions and groups to compare them on one chart per indicator,
+          or put together a custom group of countries
+
+          """,
+                style={
+                    "textAlign": "center",
+                    "font-size": "22px",
+                    "font-family": "arial",
+                    "color": "#C65D7B",
+                },
+            ),
+            html.Div(
+                [
+                    dcc.Dropdown(
+                        id="countries",
+                        options=[{"label": i, "value": i} for i in available_country]
+                        + [
+                            {"label": "%s (region)" % i, "value": i}
+                            for i in snapshot.rollup_store.regions.countries
+                        ]
+                        + [
+                            {"label": "%s (group)" % i, "value": i}
+                            for i in snapshot.rollup_store.groups
+                        ],
+                        value=[
+                            country
+                            for country in MULTI_DEFAULT_COUNTRIES
+                            if country in snapshot.series_cube
+                        ],
+                        multi=True,
+                    ),
+                    dcc.Dropdown(
+                        id="custom-group",
+                        options=[{"label": i, "value": i} for i in available_country],
+                        value=[],
+                        multi=True,
+                        placeholder="Custom group: select its member countries",
+                    ),
+                ],
+                style={
+                    "borderBottom": "thin lightgrey solid",
+                    "backgroundColor": "#676FA3",
+                    "padding": "10px 5px",
+                },
+            ),
+            html.Div(
+                [
+                    html.Div(
+                        [dcc.Graph(id="multi-time-series%d" % i)],
+                        style={"width": "49%", "display": "inline-block"},
+                    )
+                    for i in range(len(MULTI_CHARTS))
+                ],
+                style={"backgroundColor": "#676FA3", "padding": "10px 5px"},
+            ),
+            html.Br(),
+            html.Br(),
+            html.H1(
+                children="Leaderboard",
+                style={
+                    "font-family": "monospace",
+                    "font-size": "42px",
+                    "backgroundColor": "#FAEDF0",
+                    "textAlign": "center",
+                    "color": "#874356",
+                },
+            ),
+            html.Div(
+                [
+                    dcc.Dropdown(
+                        id="leaderboard-series",
+                        options=[{"label": i, "value": i} for i in snapshot.trend_table.series],
+                        value=COMPARISON_CHARTS[0][0],
+                        clearable=False,
+                    ),
+                    dcc.RadioItems(
+                        id="leaderboard-by",
+                        options=[
+                            {"label": trends.COLUMNS[name], "value": name}
+                            for name in trends.RANKED
+                        ],
+                        value="latest",
+                        inline=True,
+                    ),
+                    dcc.RadioItems(
+                        id="leaderboard-end",
+                        options=[
+                            {"label": "Top", "value": "top"},
+                            {"label": "Bottom", "value": "bottom"},
+                        ],
+                        value="top",
+                        inline=True,
+                    ),
+                    dcc.Slider(
+                        id="leaderboard-n", min=5, max=50, step=5, value=LEADERBOARD_SIZE
+                    ),
+                    dash_table.DataTable(id="leaderboard", columns=LEADERBOARD_COLUMNS),
+                ],
+                style={"textAlign": "center", "padding": "10px 5px"},
+            ),
+            html.Br(),
+            html.Br(),
+            html.H1(
+                children="Temperature vs Indicators",
+                style={
+                    "font-family": "monospace",
+                    "font-size": "42px",
+                    "backgroundColor": "#FAEDF0",
+                    "textAlign": "center",
+                    "color": "#874356",
+                },
+            ),
+            html.Div(
+                [
+                    dcc.Dropdown(
+                        id="panel-x",
+                        options=[{"label": i, "value": i} for i in snapshot.series_cube.series],
+                        value=PANEL_X,
+                        clearable=False,
+                    ),
+                    dcc.Dropdown(
+                        id="panel-y",
+                        options=[
+                            {"label": i, "value": i}
+                            for i in [panel.TEMPERATURE] + snapshot.series_cube.series
+                        ],
+                        value=panel.TEMPERATURE,
+                        clearable=False,
+                    ),
+                    dcc.Dropdown(
+                        id="panel-size",
+                        options=[{"label": i, "value": i} for i in snapshot.series_cube.series],
+                        value=PANEL_SIZE if PANEL_SIZE in snapshot.series_cube.series else None,
+                        placeholder="Bubble size",
+                    ),
+                    dcc.Graph(id="panel-scatter"),
+                    dcc.Slider(
+                        id="panel-year",
+                        min=int(snapshot.series_cube.years[0]),
+                        max=int(snapshot.series_cube.years[-1]),
+                        step=1,
+                        value=PANEL_DEFAULT_YEAR,
+                        marks={
+                            int(year): str(year)
+                            for year in snapshot.series_cube.years
+                            if year % 10 == 0
+                        },
+                    ),
+                ],
+                style={"padding": "10px 5px"},
+            ),
+            html.Br(),
+            html.Br(),
+            html.H1(
+                children="World Map Plots ",
+                style={
+                    "font-family": "monospace",
+                    "font-size": "42px",
+                    "backgroundColor": "#FAEDF0",
+                    "textAlign": "center",
+                    "color": "#874356",
+                },
+            ),
+            html.Div(
+                [
+                    dcc.DatePickerRange(
+                        id="map-dates",
+                        start_date=maps.start_date,
+                        end_date=maps.end_date,
+                        display_format="YYYY-MM-DD",
+                    ),
+                    dcc.RadioItems(
+                        id="map-frames",
+                        options=[
+                            {"label": label, "value": period}
+                            for period, label in maps.FRAME_PERIODS.items()
+                        ],
+                        value="month",
+                        inline=True,
+                    ),
+                ]
+                + map_job_controls(),
+                style={"textAlign": "center", "padding": "10px 5px"},
+            ),
+            html.Br(),
+            html.Div(
+                [dcc.Graph(id="world-map-1")],
+                style={
+                    "width": "90%",
+                    "display": "inline-block",
+                    "backgroundColor": "#FAEDF0",
+                },
+            ),
+            html.Br(),
+            html.Div(
+                [dcc.Graph(id="world-map-2")],
+                style={
+                    "width": "90%",
+                    "display": "inline-block",
+                    "backgroundColor": "#FAEDF0",
+                },
+            ),
+        ]
     )
-    return figure1, figure2
-
 
-@app.callback(
-    dash.dependencies.Output("x-time-series3", "figure"),
-    dash.dependencies.Output("y-time-series3", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
-)
-# Different code to find min,max values
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1]
 
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"]
-        == "Electricity production from oil, gas and coal sources (% of total)"
+def map_job_controls():
+    # progress bar and cancel button of the background map builds
+    if background_manager is None:
+        return []
+    return [
+        html.Progress(id="map-progress", value="0", max="2", style={"visibility": "hidden"}),
+        html.Button("Cancel", id="map-cancel", disabled=True),
     ]
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
 
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2]
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"]
-        == "Electricity production from oil, gas and coal sources (% of total)"
-    ]
 
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
+app.layout = serve_layout
 
-    maxva2 = max(maxv + maxv2)
-    minva2 = min(minv + minv2)
 
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="Electricity production from oil, gas and coal sources",
-        range_y=[minva2, maxva2],
-    )
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="Electricity production from oil, gas and coal sources",
-        range_y=[minva2, maxva2],
+# Line trace of one indicator for one country, built once per data version and
+# then served from the trace cache
+def line_trace(snapshot, country, series):
+    series_store = snapshot.series_store
+    return trace_cache.get(
+        (snapshot.version, country, series),
+        lambda: figures.line_trace(series_store.years, series_store.get(country, series)),
     )
-    return figure1, figure2
-
-
-@app.callback(
-    dash.dependencies.Output("x-time-series4", "figure"),
-    dash.dependencies.Output("y-time-series4", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
-)
-# Below code defines the function that will create a dataframe and a time series graph based on country selected in the dropdown.
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1]
-
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"]
-        == "Electricity production from renewable sources, excluding hydroelectric (kWh)"
-    ]
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
 
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2]
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"]
-        == "Electricity production from renewable sources, excluding hydroelectric (kWh)"
-    ]
 
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
-
-    maxva2 = max(maxv + maxv2)
-    minva2 = min(minv + minv2)
+# Build the time series charts for every indicator in COMPARISON_CHARTS in one pass
+def comparison_charts(country1, country2):
+    snapshot = data.current # one consistent snapshot for the whole response
+    series = [series_name for series_name, _, _, _ in COMPARISON_CHARTS]
+
+    # shared y-axis range of every indicator from the precomputed min/max table,
+    # ignoring a country that has no data for the indicator
+    with metrics.timer("comparison", "slice"):
+        minv, maxv, count = snapshot.series_store.stats([country1, country2], series)
+        range_min = np.fmin.reduce(minv, axis=0)
+        range_max = np.fmax.reduce(maxv, axis=0)
+
+    charts = []
+    with metrics.timer("comparison", "figure"):
+        for i, (series_name, title, _, _) in enumerate(COMPARISON_CHARTS):
+            # let plotly autoscale when neither country has data for the indicator
+            range_y = [range_min[i], range_max[i]] if count[:, i].any() else None
+            for j, country in enumerate((country1, country2)):
+                charts.append(
+                    figures.chart_figure(
+                        line_trace(snapshot, country, series_name), title, range_y, count[j, i] > 0
+                    )
+                )  # Create a time series graph for the indicator
+    return charts
+
+
+CHART_OUTPUTS = [
+    dash.dependencies.Output(graph_id, "figure")
+    for _, _, graph1, graph2 in COMPARISON_CHARTS
+    for graph_id in (graph1, graph2)
+]
 
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="Electricity production from renewable sources, excluding hydroelectric (kWh)",
-        range_y=[minva2, maxva2],
+if CLIENTSIDE_CHARTS:
+    # The browser loads the series bundle once from its hash-named script,
+    # copies it into the "series-store" dcc.Store and redraws the charts itself
+    # on every country change (see assets/clientside.js)
+    app.clientside_callback(
+        dash.dependencies.ClientsideFunction("climate", "loadSeriesStore"),
+        dash.dependencies.Output("series-store", "data"),
+        dash.dependencies.Input("series-version", "data"),
+    )
+    app.clientside_callback(
+        dash.dependencies.ClientsideFunction("climate", "comparisonCharts"),
+        CHART_OUTPUTS,
+        dash.dependencies.Input("country1", "value"),
+        dash.dependencies.Input("country2", "value"),
+        dash.dependencies.Input("series-store", "data"),
     )
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="Electricity production from renewable sources, excluding hydroelectric (kWh)",
-        range_y=[minva2, maxva2],
+else:
+    # Define the callback which is responsible for the interactivity in the graph,
+    # Input value is from the dropdown and output is every time series chart, so a
+    # country change is served by a single request
+    @app.callback(
+        CHART_OUTPUTS,
+        dash.dependencies.Input("country1", "value"),
+        dash.dependencies.Input("country2", "value"),
     )
-    return figure1, figure2
+    def update_charts(country1, country2):
+        return comparison_charts(country1, country2)
 
 
+# One chart per indicator with a line for every selected country, region or
+# group (plus the custom group, if any): the values of all of them are one
+# slice of the rollup store and their shared y-axis ranges one reduction,
+# whatever the number of lines
 @app.callback(
-    dash.dependencies.Output("x-time-series5", "figure"),
-    dash.dependencies.Output("y-time-series5", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
+    [
+        dash.dependencies.Output("multi-time-series%d" % i, "figure")
+        for i in range(len(MULTI_CHARTS))
+    ],
+    dash.dependencies.Input("countries", "value"),
+    dash.dependencies.Input("custom-group", "value"),
 )
-# Below code defines the function that will create a dataframe and a time series graph based on country selected in the dropdown.
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1]
-
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"]
-        == "Other greenhouse gas emissions, HFC, PFC and SF6 (thousand metric tons of CO2 equivalent)"
-    ]
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
-
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2]
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"]
-        == "Other greenhouse gas emissions, HFC, PFC and SF6 (thousand metric tons of CO2 equivalent)"
-    ]
-
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
-
-    maxva2 = max(maxv + maxv2)
-    minva2 = min(minv + minv2)
-
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="Other greenhouse gas emissions, HFC, PFC and SF6",
-        range_y=[minva2, maxva2],
-    )
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="Other greenhouse gas emissions, HFC, PFC and SF6",
-        range_y=[minva2, maxva2],
-    )
-    return figure1, figure2
-
-
+def update_multi_charts(countries, custom_group):
+    snapshot = data.current
+    countries = list(countries or [])
+    groups = {}
+    if custom_group:
+        groups["Custom group"] = custom_group
+        countries.append("Custom group")
+    with metrics.timer("multi", "slice"):
+        block = snapshot.rollup_store.slice(
+            countries, [series_name for series_name, _ in MULTI_CHARTS], groups
+        )
+        range_min, range_max, count = SeriesCube.ranges(block)
+    with metrics.timer("multi", "figure"):
+        return [
+            figures.multi_country_figure(
+                snapshot.series_cube.years,
+                block[i],
+                countries,
+                title,
+                [range_min[i], range_max[i]] if count[i] else None,
+            )
+            for i, (_, title) in enumerate(MULTI_CHARTS)
+        ]
+
+
+# The leaderboard is a slice of the precomputed order of the trend table
 @app.callback(
-    dash.dependencies.Output("x-time-series6", "figure"),
-    dash.dependencies.Output("y-time-series6", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
+    dash.dependencies.Output("leaderboard", "data"),
+    dash.dependencies.Input("leaderboard-series", "value"),
+    dash.dependencies.Input("leaderboard-by", "value"),
+    dash.dependencies.Input("leaderboard-end", "value"),
+    dash.dependencies.Input("leaderboard-n", "value"),
 )
-# Below code defines the function that will create a dataframe and a time series graph based on country selected in the dropdown.
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1]
-
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"]
-        == "Total greenhouse gas emissions (kt of CO2 equivalent)"
-    ]
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
-
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2]
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"]
-        == "Total greenhouse gas emissions (kt of CO2 equivalent)"
-    ]
-
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
-
-    maxva2 = max(maxv + maxv2)
-    minva2 = min(minv + minv2)
-
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="Total greenhouse gas emissions (kt of CO2 equivalent)",
-        range_y=[minva2, maxva2],
-    )
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="Total greenhouse gas emissions (kt of CO2 equivalent)",
-        range_y=[minva2, maxva2],
-    )
-    return figure1, figure2
+def update_leaderboard(series, by, end, n):
+    with metrics.timer("leaderboard", "slice"):
+        return data.current.trend_table.leaderboard(
+            series, by, int(n or LEADERBOARD_SIZE), bottom=end == "bottom"
+        )
 
 
+# The scatter explorer reads one year of the precomputed panel, so moving the
+# slider is an array slice
 @app.callback(
-    dash.dependencies.Output("x-time-series7", "figure"),
-    dash.dependencies.Output("y-time-series7", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
+    dash.dependencies.Output("panel-scatter", "figure"),
+    dash.dependencies.Input("panel-x", "value"),
+    dash.dependencies.Input("panel-y", "value"),
+    dash.dependencies.Input("panel-size", "value"),
+    dash.dependencies.Input("panel-year", "value"),
 )
-# Below code defines the function that will create a dataframe and a time series graph based on country selected in the dropdown.
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1]
-
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"]
-        == "Population density (people per sq. km of land area)"
-    ]
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
-
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2]
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"]
-        == "Population density (people per sq. km of land area)"
-    ]
-
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
+def update_panel(x_name, y_name, size_name, year):
+    with metrics.timer("panel", "slice"):
+        climate = panel.climate_panel(data.current, maps.temperature_index())
+        names = [x_name, y_name] + ([size_name] if size_name else [])
+        values = climate.at_year(names, int(year or PANEL_DEFAULT_YEAR))
+    with metrics.timer("panel", "figure"):
+        size_range = climate.ranges.get(size_name) if size_name else None
+        return figures.scatter_figure(
+            values[0],
+            values[1],
+            climate.countries,
+            (x_name, y_name),
+            size=values[2] if size_name else None,
+            size_max=size_range[1] if size_range else None,
+            ranges=(climate.ranges.get(x_name), climate.ranges.get(y_name)),
+        )
+
+
+# The world maps are built on request for the selected date window; the
+# temperature data is loaded on the first request in each worker, so worker
+# startup does not pay for it. With a background manager they are built in a
+# job process that reports its progress and can be cancelled, so a wide window
+# does not hold a worker. Otherwise the serialized responses are cached by input
+# values (see serialization.py), and the default window of the page is
+# precomputed in the background at startup
+MAP_OUTPUTS = [
+    dash.dependencies.Output("world-map-1", "figure"),
+    dash.dependencies.Output("world-map-2", "figure"),
+]
+MAP_INPUTS = [
+    dash.dependencies.Input("map-dates", "start_date"),
+    dash.dependencies.Input("map-dates", "end_date"),
+    dash.dependencies.Input("map-frames", "value"),
+]
 
-    maxva2 = max(maxv + maxv2)
-    minva2 = min(minv + minv2)
 
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="Population density (people per sq. km of land area)",
-        range_y=[minva2, maxva2],
+def build_maps(start_date, end_date, period, progress=None):
+    with metrics.timer("maps", "figure"):
+        return maps.map_figures(
+            start_date or maps.start_date, end_date or maps.end_date, period, progress
+        )
+
+
+if background_manager is None:
+    map_responses.register(MAP_OUTPUTS)
+    update_maps = app.callback(MAP_OUTPUTS, MAP_INPUTS)(build_maps)
+else:
+
+    @app.callback(
+        MAP_OUTPUTS,
+        MAP_INPUTS,
+        background=True,
+        manager=background_manager,
+        progress=[
+            dash.dependencies.Output("map-progress", "value"),
+            dash.dependencies.Output("map-progress", "max"),
+        ],
+        running=[
+            (dash.dependencies.Output("map-cancel", "disabled"), False, True),
+            (
+                dash.dependencies.Output("map-progress", "style"),
+                {"visibility": "visible"},
+                {"visibility": "hidden"},
+            ),
+        ],
+        cancel=[dash.dependencies.Input("map-cancel", "n_clicks")],
     )
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="Population density (people per sq. km of land area)",
-        range_y=[minva2, maxva2],
+    def update_maps(set_progress, start_date, end_date, period):
+        return build_maps(
+            start_date,
+            end_date,
+            period,
+            lambda done, total: set_progress((str(done), str(total))),
+        )
+
+
+def precompute_default_maps():
+    # the request every page load makes, answered once so its bytes are cached
+    update_path = app.config.routes_pathname_prefix + "_dash-update-component"
+    server.test_client().post(
+        update_path,
+        json={
+            "output": "..world-map-1.figure...world-map-2.figure..",
+            "outputs": [
+                {"id": "world-map-1", "property": "figure"},
+                {"id": "world-map-2", "property": "figure"},
+            ],
+            "inputs": [
+                {"id": "map-dates", "property": "start_date", "value": maps.start_date},
+                {"id": "map-dates", "property": "end_date", "value": maps.end_date},
+                {"id": "map-frames", "property": "value", "value": "month"},
+            ],
+            "changedPropIds": [],
+            "state": [],
+        },
     )
-    return figure1, figure2
 
 
-@app.callback(
-    dash.dependencies.Output("x-time-series8", "figure"),
-    dash.dependencies.Output("y-time-series8", "figure"),
-    dash.dependencies.Input("country1", "value"),
-    dash.dependencies.Input("country2", "value"),
-)
-# Below code defines the function that will create a dataframe and a time series graph based on country selected in the dropdown.
-def update_charts(country1, country2):
-    filtered_df = df_flat.loc[df_flat["Country Name"] == country1]
-
-    CO2_df = filtered_df.loc[
-        filtered_df["Series Name"] == "Fossil fuel energy consumption (% of total)"
-    ]
-    maxv = CO2_df.nlargest(1, "value")["value"].values.tolist()
-    minv = CO2_df.nsmallest(1, "value")["value"].values.tolist()
-
-    filtered_df2 = df_flat.loc[df_flat["Country Name"] == country2]
-    CO2_df2 = filtered_df2.loc[
-        filtered_df2["Series Name"] == "Fossil fuel energy consumption (% of total)"
-    ]
-
-    maxv2 = CO2_df2.nlargest(1, "value")["value"].values.tolist()
-    minv2 = CO2_df2.nsmallest(1, "value")["value"].values.tolist()
-
-    maxva2 = max(maxv + maxv2)
-    minva2 = min(minv + minv2)
-
-    figure1 = px.line(
-        CO2_df,
-        x="Year",
-        y="value",
-        title="Fossil fuel energy consumption (% of total)",
-        range_y=[minva2, maxva2],
-    )
-    figure2 = px.line(
-        CO2_df2,
-        x="Year",
-        y="value",
-        title="Fossil fuel energy consumption (% of total)",
-        range_y=[minva2, maxva2],
-    )
-    return figure1, figure2
+if background_manager is None and os.environ.get("PRECOMPUTE_MAPS", "1") == "1":
+    threading.Thread(target=precompute_default_maps, name="precompute-maps", daemon=True).start()
 
 
 if __name__ == "__main__": # This code is executed only when the file is run directly.
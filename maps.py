@@ -0,0 +1,319 @@
+# World map figures of the Berkeley Earth temperature data
+#
+# The maps are not built at import: the dashboard requests them through a
+# callback once the page has loaded, and the first request in each worker
+# process loads the temperature history into a date-sorted index. Any date
+# window is then a binary-searched slice of that index, and the figures of the
+# most requested windows are kept in a bounded LRU cache. The index is a
+# snapshot (see snapshot.py) that is rebuilt and swapped in when the source
+# file changes, and its arrays are memory-mapped files shared by the workers.
+#
+# The maps locate the countries by their ISO-3 code (see countries.py) with
+# ``locationmode="ISO-3"``, so plotly does not have to resolve names.
+#
+# The timeline map can aggregate the months into seasonal or yearly frames, and
+# its frames carry only the ``z`` vector over one shared location ordering, so
+# long windows do not repeat every country name in every frame.
+import functools
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+from countries import load_country_table
+from data_loader import TEMPERATURE_SOURCE, load_temperature, shared_arrays
+from snapshot import SnapshotHolder
+
+# Default date range of the maps
+start_date = "2000-01-01"  # start date
+end_date = "2002-01-01"  # end date
+
+MAP_CACHE_SIZE = 32  # date windows whose figures are kept ready
+
+# Animation frame periods of the timeline map: value -> radio button label
+FRAME_PERIODS = {"month": "Monthly", "season": "Seasonal", "year": "Yearly"}
+SEASONS = ["DJF", "MAM", "JJA", "SON"]  # meteorological seasons, December starts winter
+HOVERTEMPLATE = "<b>%{text}</b><br>AvTemp=%{z}<extra></extra>"  # country name and temperature
+
+
+class TemperatureIndex:
+    """Monthly temperature per country, sorted by date for binary-searched windows.
+
+    The index is three parallel arrays (date, country code, temperature), so it
+    can be written once and memory-mapped by every worker (see ``load_index``).
+    The ISO-3 code of each country is looked up in ``country_table``, by
+    default the table of the World Bank export.
+    """
+
+    def __init__(self, df, country_table=None):
+        countries = df["Country"].astype("category").cat
+        dates = df["Date"].to_numpy(dtype="datetime64[ns]")
+        codes = countries.codes.to_numpy()
+        temperatures = df["AvTemp"].to_numpy(dtype=np.float64)
+
+        # one row per (date, country), ascending by date; sorting the arrays
+        # and summing runs of equal keys peaks lower than a dataframe groupby
+        order = np.lexsort((codes, dates))
+        dates, codes, temperatures = dates[order], codes[order], temperatures[order]
+        first = np.ones(len(dates), dtype=bool)
+        first[1:] = (dates[1:] != dates[:-1]) | (codes[1:] != codes[:-1])
+        starts = np.flatnonzero(first)
+        self.dates = dates[starts]
+        self.codes = codes[starts]
+        self.temperatures = np.add.reduceat(temperatures, starts) if len(starts) else temperatures
+        self.countries = [str(country) for country in countries.categories]
+        self._locate(country_table)
+
+    def export(self):
+        """The arrays and JSON metadata ``from_export`` rebuilds this index from."""
+        arrays = {"dates": self.dates, "codes": self.codes, "temperatures": self.temperatures}
+        return arrays, {"countries": self.countries}
+
+    @classmethod
+    def from_export(cls, arrays, meta, country_table=None):
+        """Index over already built arrays, e.g. read-only memory maps shared by the workers."""
+        index = cls.__new__(cls)
+        index.dates = arrays["dates"]
+        index.codes = arrays["codes"]
+        index.temperatures = arrays["temperatures"]
+        index.countries = list(meta["countries"])
+        index._locate(country_table)
+        return index
+
+    def _locate(self, country_table):
+        # ISO-3 code of every country, as a code into ``self.iso3`` (-1 for none)
+        iso3 = (country_table or load_country_table()).resolve(self.countries)
+        self.iso3 = sorted(set(code for code in iso3 if code is not None))
+        positions = {code: i for i, code in enumerate(self.iso3)}
+        self.iso3_codes = np.array([positions.get(code, -1) for code in iso3], dtype=np.int64)
+
+    def window(self, start_date, end_date):
+        """Return the (lo, hi) row bounds of start_date < Date <= end_date."""
+        lo = np.searchsorted(self.dates, np.datetime64(start_date), side="right")
+        hi = np.searchsorted(self.dates, np.datetime64(end_date), side="right")
+        return int(lo), int(max(lo, hi))
+
+    def slice(self, lo, hi):
+        """Date, Country, Code (ISO-3) and AvTemp rows ``lo:hi`` as a dataframe.
+
+        Countries without an ISO-3 code have a missing Code.
+        """
+        codes = np.asarray(self.codes[lo:hi])
+        return pd.DataFrame(
+            {
+                "Date": np.asarray(self.dates[lo:hi]),
+                "Country": pd.Categorical.from_codes(codes, self.countries),
+                "Code": pd.Categorical.from_codes(self.iso3_codes[codes], self.iso3),
+                "AvTemp": np.asarray(self.temperatures[lo:hi]),
+            }
+        )
+
+
+def load_index(source=TEMPERATURE_SOURCE):
+    """The temperature index of ``source``, mapped from the shared array files."""
+    country_table = load_country_table()
+    arrays, meta = shared_arrays(
+        source,
+        "index",
+        lambda: TemperatureIndex(load_temperature(source), country_table).export(),
+    )
+    return TemperatureIndex.from_export(arrays, meta, country_table)
+
+
+def _clear_map_caches(index):
+    # figures of the previous index are never requested again
+    _world_map.cache_clear()
+    _timeline_map.cache_clear()
+
+
+# The full temperature history, loaded once per process on first use
+temperature = SnapshotHolder(
+    load_index,
+    [TEMPERATURE_SOURCE],
+    lazy=True,
+    on_swap=_clear_map_caches,
+)
+
+
+def temperature_index():
+    """The current temperature index, loading it on first use."""
+    return temperature.get()
+
+
+def temperature_version():
+    """Version of the current temperature data, loading it on first use."""
+    temperature.get()
+    return temperature.version
+
+
+def map_figures(start_date, end_date, period="month", progress=None):
+    """Return the (world map, timeline map) figure dicts for a date window.
+
+    Windows are cached by their row bounds, so any two date ranges that cover
+    the same months share one cache entry. ``progress(done, total)`` is called
+    as each figure is built.
+    """
+    index = temperature_index()
+    lo, hi = index.window(start_date, end_date)
+    world_map = _world_map(index, lo, hi)
+    if progress is not None:
+        progress(1, 2)
+    timeline_map = _timeline_map(index, lo, hi, period)
+    if progress is not None:
+        progress(2, 2)
+    return world_map, timeline_map
+
+
+@functools.lru_cache(maxsize=MAP_CACHE_SIZE)
+def _world_map(index, lo, hi):
+    return world_map_figure(index.slice(lo, hi)).to_dict()
+
+
+@functools.lru_cache(maxsize=MAP_CACHE_SIZE)
+def _timeline_map(index, lo, hi, period):
+    return timeline_map_figure(index.slice(lo, hi), period).to_dict()
+
+
+def world_map_figure(df_countrydate):
+    """Choropleth of every monthly temperature in the window."""
+    df_countries = df_countrydate.iloc[::-1]  # newest first
+    df_countries = df_countries[df_countries["Code"].notna()]
+    fig = go.Figure(
+        data=go.Choropleth(
+            locations=df_countries["Code"],
+            locationmode="ISO-3",
+            z=df_countries["AvTemp"],
+            text=df_countries["Country"],
+            hovertemplate=HOVERTEMPLATE,
+            colorscale="Reds",
+            marker_line_color="black",
+            marker_line_width=0.5,
+        )
+    )
+    fig.update_layout(
+        title_text="Climate Change",
+        title_x=0.5,
+        geo=dict(showframe=False, showcoastlines=False, projection_type="equirectangular"),
+    )
+    return fig
+
+
+def frame_keys(dates, period):
+    """Return an integer frame key per date for ``period`` ("month", "season" or "year")."""
+    year = dates.dt.year.to_numpy()
+    month = dates.dt.month.to_numpy()
+    if period == "year":
+        return year
+    if period == "season":
+        return (year + (month == 12)) * 4 + month % 12 // 3  # December counts toward next winter
+    return year * 12 + month - 1
+
+
+def frame_label(key, period):
+    """Inverse of ``frame_keys``: the slider label of a frame key."""
+    if period == "year":
+        return "%d" % key
+    if period == "season":
+        return "%d %s" % (key // 4, SEASONS[key % 4])
+    return "%04d-%02d-01" % (key // 12, key % 12 + 1)
+
+
+def timeline_map_figure(df_countrydate, period="month"):
+    """Choropleth animated over the months, seasons or years of the window.
+
+    The base trace holds the location ordering and the country names once
+    and every frame only updates its ``z`` vector; countries without data in
+    a frame are null.
+    """
+    # mean temperature per (frame, country), one row per frame
+    df_frames = (
+        df_countrydate.assign(frame=frame_keys(df_countrydate["Date"], period))
+        .groupby(["frame", "Code"], observed=True)["AvTemp"]
+        .mean()
+        .unstack("Code")
+    )
+    locations = df_frames.columns.astype(str).tolist()
+    names = df_countrydate.groupby("Code", observed=True)["Country"].first()
+    text = names.reindex(df_frames.columns).astype(str).tolist()
+    z = df_frames.to_numpy()
+    labels = [frame_label(key, period) for key in df_frames.index]
+
+    fig2 = go.Figure(
+        data=[
+            go.Choropleth(
+                locations=locations,
+                locationmode="ISO-3",
+                z=z[0] if len(z) else [],
+                text=text,
+                coloraxis="coloraxis",
+                hovertemplate=HOVERTEMPLATE,
+            )
+        ],
+        frames=[
+            go.Frame(name=label, data=[go.Choropleth(z=values)], traces=[0])
+            for label, values in zip(labels, z)
+        ],
+    )
+    fig2.update_layout(
+        title_text="Average Temperature Change",
+        title_x=0.5,
+        geo=dict(
+            showframe=False,
+            showcoastlines=False,
+        ),
+        coloraxis=dict(colorbar=dict(title=dict(text="AvTemp"))),
+    )
+    if len(z):
+        # one colour range for the whole animation
+        fig2.update_layout(coloraxis=dict(cmin=np.nanmin(z), cmax=np.nanmax(z)))
+        fig2.update_layout(_animation_controls(labels))
+    return fig2
+
+
+def _animation_controls(labels):
+    # play/pause buttons and frame slider, as plotly express lays them out
+    def animate(frames, duration):
+        return [
+            frames,
+            {
+                "frame": {"duration": duration, "redraw": True},
+                "mode": "immediate",
+                "fromcurrent": True,
+                "transition": {"duration": duration, "easing": "linear"},
+            },
+        ]
+
+    return dict(
+        updatemenus=[
+            dict(
+                type="buttons",
+                direction="left",
+                pad={"r": 10, "t": 70},
+                showactive=False,
+                x=0.1,
+                xanchor="right",
+                y=0,
+                yanchor="top",
+                buttons=[
+                    dict(label="&#9654;", method="animate", args=animate(None, 500)),
+                    dict(label="&#9724;", method="animate", args=animate([None], 0)),
+                ],
+            )
+        ],
+        sliders=[
+            dict(
+                active=0,
+                currentvalue={"prefix": "Date="},
+                len=0.9,
+                pad={"b": 10, "t": 60},
+                x=0.1,
+                xanchor="left",
+                y=0,
+                yanchor="top",
+                steps=[
+                    dict(label=label, method="animate", args=animate([label], 0))
+                    for label in labels
+                ],
+            )
+        ],
+    )
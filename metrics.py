@@ -0,0 +1,215 @@
+# Latency and payload instrumentation of the dashboard callbacks
+#
+# Callbacks time their stages (data slicing, figure construction) with
+# ``timer``, and the Flask hooks installed by ``instrument`` add the time Dash
+# spends after the callback returns (JSON serialization of the outputs) plus
+# the size of the response. Responses answered from a response cache are
+# recorded under their callback's name with a "cached" stage (see ``label``).
+# Everything is kept in process-local histograms and served by the ``/metrics``
+# route in the Prometheus text format; with several workers, each scrape sees
+# the worker that answered it.
+#
+# Profiling is opt-in: with PROFILE_REQUESTS=1, callback requests that carry an
+# ``X-Profile: 1`` header, plus a random PROFILE_SAMPLE_RATE fraction of all of
+# them, are run under cProfile and their stats written to PROFILE_DIR. Only
+# those requests pay for decoding the response to record the size of each
+# output; every other request only records the length of its body.
+import bisect
+import contextlib
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import flask
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = tuple(2**i for i in range(10, 25, 2))  # 1 KiB .. 16 MiB
+
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(".cache", "profiles"))
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with a fixed set of label names."""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i in range(index, len(self.buckets)):
+                series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [
+            "# HELP %s %s" % (self.name, self.documentation),
+            "# TYPE %s histogram" % self.name,
+        ]
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for label_values, values in series:
+            labels = ",".join(
+                '%s="%s"' % (name, _escape(value))
+                for name, value in zip(self.label_names, label_values)
+            )
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-2] + [values[-2]]):
+                le = bound if isinstance(bound, str) else repr(float(bound))
+                lines.append('%s_bucket{%s,le="%s"} %d' % (self.name, labels, le, count))
+            lines.append("%s_count{%s} %d" % (self.name, labels, values[-2]))
+            lines.append("%s_sum{%s} %r" % (self.name, labels, float(values[-1])))
+        return "\n".join(lines)
+
+
+stage_seconds = Histogram(
+    "dashboard_callback_stage_seconds",
+    "Time spent per callback stage (slice, figure, serialize).",
+    ["callback", "stage"],
+    SECONDS_BUCKETS,
+)
+request_seconds = Histogram(
+    "dashboard_callback_request_seconds",
+    "Total time of a callback request, from receipt to response.",
+    ["callback"],
+    SECONDS_BUCKETS,
+)
+response_bytes = Histogram(
+    "dashboard_callback_response_bytes",
+    "Size of each callback response body, before compression.",
+    ["callback"],
+    BYTES_BUCKETS,
+)
+output_bytes = Histogram(
+    "dashboard_output_bytes",
+    "Serialized size of each callback output, recorded for profiled requests only.",
+    ["output"],
+    BYTES_BUCKETS,
+)
+HISTOGRAMS = [stage_seconds, request_seconds, response_bytes, output_bytes]
+
+# Extra metric families rendered by ``/metrics``: functions returning their text
+collectors = []
+
+
+@contextlib.contextmanager
+def timer(callback, stage):
+    """Time the enclosed block as ``stage`` of ``callback``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, callback, stage)
+        if flask.has_request_context():
+            flask.g.metrics_callback = callback
+            flask.g.metrics_callback_seconds = flask.g.get("metrics_callback_seconds", 0) + elapsed
+
+
+def label(callback, cached=False):
+    """Record the current request under ``callback``, e.g. when a cache answers it.
+
+    ``cached`` responses record their whole time as the "cached" stage
+    instead of a serialization time.
+    """
+    if flask.has_request_context():
+        flask.g.metrics_callback = callback
+        flask.g.metrics_cached = cached
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    families = [histogram.render() for histogram in HISTOGRAMS]
+    families += [collect() for collect in collectors]
+    return "\n".join(families) + "\n"
+
+
+def instrument(server, update_path):
+    """Install the request hooks and the ``/metrics`` route on the Flask ``server``.
+
+    ``update_path`` is the Dash callback endpoint whose requests are measured.
+    """
+    profile_lock = threading.Lock()  # cProfile allows one active profiler
+
+    @server.before_request
+    def start_request():
+        if flask.request.path != update_path:
+            return
+        flask.g.metrics_start = time.perf_counter()
+        if PROFILE_REQUESTS and (
+            flask.request.headers.get("X-Profile") == "1" or random.random() < PROFILE_SAMPLE_RATE
+        ):
+            if profile_lock.acquire(blocking=False):
+                flask.g.metrics_profile = cProfile.Profile()
+                flask.g.metrics_profile.enable()
+
+    @server.after_request
+    def record_request(response):
+        start = flask.g.pop("metrics_start", None)
+        if start is None:
+            return response
+        profile = flask.g.pop("metrics_profile", None)
+        if profile is not None:
+            profile.disable()
+            profile_lock.release()
+
+        callback = flask.g.get("metrics_callback", "other")
+        elapsed = time.perf_counter() - start
+        request_seconds.observe(elapsed, callback)
+        if flask.g.get("metrics_cached"):
+            stage_seconds.observe(elapsed, callback, "cached")
+        elif callback != "other":
+            # whatever Dash did after the callback returned, mostly JSON encoding
+            serialize = elapsed - flask.g.get("metrics_callback_seconds", 0)
+            stage_seconds.observe(max(serialize, 0.0), callback, "serialize")
+        if response.status_code == 200 and response.mimetype == "application/json":
+            body = response.get_data()
+            response_bytes.observe(len(body), callback)
+            if profile is not None:
+                # decoding the response costs more than the callback itself
+                for output_id, value in _outputs(body):
+                    output_bytes.observe(len(value), output_id)
+        if profile is not None:
+            _dump_profile(profile, callback)
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return flask.Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def _outputs(body):
+    # (output id, serialized value) of every output in a Dash callback response
+    try:
+        response = json.loads(body).get("response", {})
+    except ValueError:
+        return []
+    return [
+        ("%s.%s" % (output_id, prop), json.dumps(value, separators=(",", ":")))
+        for output_id, props in response.items()
+        for prop, value in props.items()
+    ]
+
+
+def _dump_profile(profile, callback):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = "%s-%d-%s.prof" % (time.strftime("%Y%m%d-%H%M%S"), os.getpid(), re.sub(r"\W", "_", callback))
+    profile.dump_stats(os.path.join(PROFILE_DIR, name))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,88 @@
+# Joined (country, year) panel of the temperatures and the World Bank indicators
+#
+# The yearly mean temperature of every country is computed from the temperature
+# index in one vectorized pass (a bincount over (country, year) cells keyed by
+# ISO-3 code, see countries.py) and laid out on the country and year axes of
+# the indicator cube. Every column of the panel, the temperature or any
+# indicator, is then a (country, year) array, and the values of any columns in
+# one year are an array slice: the scatter explorer rebuilds no table when its
+# year slider moves.
+import functools
+
+import numpy as np
+
+TEMPERATURE = "Average temperature (°C)"  # name of the temperature column
+
+
+class ClimatePanel:
+    """Temperature and indicator columns over the countries and years of the cube.
+
+    ``country_codes`` maps the cube's country names to their ISO-3 codes, which
+    the temperature index is joined on; countries or years without data are
+    NaN.
+    """
+
+    def __init__(self, cube, country_codes, index):
+        self.countries = list(cube.countries)
+        self.years = np.asarray(cube.years)
+        self.columns = [TEMPERATURE] + list(cube.series)
+        self._cube = cube
+        self._series_index = {name: i for i, name in enumerate(cube.series)}
+        self.temperature = yearly_temperature(
+            index, [country_codes.get(name) for name in self.countries], self.years
+        )
+
+        # value range of every column over all years, so the axes stay put
+        # while the year changes
+        values = np.asarray(cube.values)[:, : len(self.countries)]
+        self.ranges = {TEMPERATURE: _range(self.temperature)}
+        for name, row in self._series_index.items():
+            self.ranges[name] = _range(values[row])
+
+    def column(self, name):
+        """The (country, year) values of a column; all NaN for an unknown name."""
+        if name == TEMPERATURE:
+            return self.temperature
+        row = self._series_index.get(name, -1)
+        if row == -1:
+            return np.full((len(self.countries), len(self.years)), np.nan)
+        return self._cube.values[row, : len(self.countries)]
+
+    def at_year(self, names, year):
+        """(len(names), country) values of the columns ``names`` in ``year``."""
+        position = np.searchsorted(self.years, year)
+        if position == len(self.years) or self.years[position] != year:
+            return np.full((len(names), len(self.countries)), np.nan)
+        return np.array([self.column(name)[:, position] for name in names])
+
+
+def yearly_temperature(index, codes, years):
+    """(len(codes), len(years)) yearly mean temperatures of the countries with these ISO-3 codes.
+
+    Every row of the index is assigned to its (country, year) cell and the
+    cells are averaged with two bincounts.
+    """
+    positions = {code: i for i, code in enumerate(codes) if code is not None}
+    to_row = np.array([positions.get(code, -1) for code in index.iso3] + [-1], dtype=np.int64)
+    rows = to_row[np.asarray(index.iso3_codes)[np.asarray(index.codes)]]  # -1 indexes the last
+    columns = np.asarray(index.dates).astype("datetime64[Y]").astype(np.int64) + 1970 - years[0]
+    keep = (rows >= 0) & (columns >= 0) & (columns < len(years))
+    cells = rows[keep] * len(years) + columns[keep]
+    size = len(codes) * len(years)
+    sums = np.bincount(cells, weights=np.asarray(index.temperatures)[keep], minlength=size)
+    counts = np.bincount(cells, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return means.reshape(len(codes), len(years))
+
+
+@functools.lru_cache(maxsize=2)
+def climate_panel(snapshot, index):
+    """The panel of a data snapshot and a temperature index, built once per pair."""
+    return ClimatePanel(snapshot.series_cube, snapshot.country_codes, index)
+
+
+def _range(values):
+    if np.isnan(values).all():
+        return None
+    return [float(np.nanmin(values)), float(np.nanmax(values))]
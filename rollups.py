@@ -0,0 +1,114 @@
+# Region and country-group rollups of the World Bank indicators
+#
+# The aggregated regions of the export ("World", "Euro area", "OECD members",
+# ...) are kept in their own indexed cube instead of being dropped, and
+# user-defined groups of countries are rolled up from the country cube with one
+# vectorized reduction over all of their series at once. The groups in
+# ``COUNTRY_GROUPS`` are rolled up at load and any other group on first use;
+# every rollup is cached by its definition, so a group line costs a row lookup
+# like a country line.
+import functools
+
+import numpy as np
+
+from data_store import SeriesCube
+
+# Groups offered next to the World Bank aggregates: name -> member countries
+COUNTRY_GROUPS = {
+    "G7": ["Canada", "France", "Germany", "Italy", "Japan", "United Kingdom", "United States"],
+    "BRICS": ["Brazil", "Russian Federation", "India", "China", "South Africa"],
+}
+
+# Series that weights the means of a group when the export has it, otherwise
+# the members count equally
+WEIGHT_SERIES = "Population, total"
+
+ROLLUP_CACHE_SIZE = 128  # group definitions whose rollups are kept
+
+
+def is_intensive(series_name):
+    """True for shares and ratios, which are averaged over a group instead of summed."""
+    return "%" in series_name or " per " in series_name
+
+
+def rollup(block, weights=None, intensive=None):
+    """Roll a (series, country, year) block up into (series, year) group values.
+
+    Extensive series are summed over the countries, intensive ones (see
+    ``is_intensive``; a boolean per series) are averaged with ``weights``, a
+    (country, year) array, or equally when it is None. Countries without data
+    for a year are left out of that year, and a year where no member has data
+    stays NaN.
+    """
+    present = ~np.isnan(block)
+    count = present.sum(axis=1)
+    totals = np.where(count > 0, np.nansum(block, axis=1), np.nan)
+    if intensive is None or not np.any(intensive):
+        return totals
+
+    weights = np.ones(block.shape[1:]) if weights is None else np.nan_to_num(weights)
+    weights = np.where(present, weights[np.newaxis], 0.0)
+    weight_sum = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.nansum(block * weights, axis=1) / weight_sum
+    means[weight_sum == 0] = np.nan
+    return np.where(np.asarray(intensive)[:, np.newaxis], means, totals)
+
+
+class RollupStore:
+    """Countries, aggregated regions and country groups behind a single lookup.
+
+    ``slice`` accepts any mix of the three kinds of names and returns the same
+    (series, name, year) block as ``SeriesCube.slice``.
+    """
+
+    def __init__(self, country_cube, df_aggregates, groups=COUNTRY_GROUPS):
+        self.countries = country_cube
+        self.regions = SeriesCube(df_aggregates)
+        self.years = country_cube.years
+        self.series = country_cube.series
+        self.groups = {
+            name: tuple(member for member in members if member in country_cube)
+            for name, members in groups.items()
+        }
+        self._series_index = {name: i for i, name in enumerate(self.series)}
+        self._intensive = np.array([is_intensive(name) for name in self.series], dtype=bool)
+        self._weights = WEIGHT_SERIES if WEIGHT_SERIES in self._series_index else None
+        self._rollup = functools.lru_cache(maxsize=ROLLUP_CACHE_SIZE)(self._build_rollup)
+        for members in self.groups.values():
+            self.group_values(members)  # precomputed at load
+
+    def group_values(self, members):
+        """Return the (series, year) rollup of a group of countries, cached by its members."""
+        return self._rollup(tuple(sorted(set(members))))
+
+    def slice(self, names, series, groups=None):
+        """(len(series), len(names), len(self.years)) block of countries, regions and groups.
+
+        ``groups`` maps extra group names to their member countries, e.g. a
+        group put together in the dashboard; they take precedence over the
+        groups the store was built with.
+        """
+        groups = dict(self.groups, **(groups or {}))
+        block = self.countries.slice(names, series)  # NaN where a name is not a country
+
+        regions = [i for i, name in enumerate(names) if name in self.regions]
+        if regions:
+            block[:, regions] = self.regions.slice([names[i] for i in regions], series)
+
+        series_rows = [self._series_index.get(name, -1) for name in series]
+        for i, name in enumerate(names):
+            if name in groups and name not in self.countries:
+                values = self.group_values(groups[name])[series_rows]
+                values[[row == -1 for row in series_rows]] = np.nan
+                block[:, i] = values
+        return block
+
+    def _build_rollup(self, members):
+        block = self.countries.slice(members, self.series)
+        weights = None
+        if self._weights is not None:
+            weights = self.countries.slice(members, [self._weights])[0]
+        values = rollup(block, weights, self._intensive)
+        values.flags.writeable = False  # shared by every request for the group
+        return values
@@ -0,0 +1,106 @@
+# JSON encoding of the callback responses
+#
+# Dash encodes every callback response with plotly's JSON encoder, whose engine
+# is selected here: "orjson" serializes numpy arrays natively and is several
+# times faster than the stdlib encoder on figure-sized payloads. JSON_ENGINE
+# picks the engine ("auto" uses orjson when it is installed).
+#
+# The map figures only depend on their inputs and the temperature data, so the
+# serialized bytes of their responses are kept in ``ResponseCache``: a repeated
+# request (above all the default window of every page load) is answered with
+# the stored bytes before Dash decodes, dispatches or encodes anything.
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import flask
+import plotly.io as pio
+
+import metrics
+
+JSON_ENGINE = os.environ.get("JSON_ENGINE", "auto")
+
+
+def configure(engine=JSON_ENGINE):
+    """Select the engine of plotly's JSON encoder, which Dash uses for every response."""
+    if engine == "auto":
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            engine = "json"
+        else:
+            engine = "orjson"
+    pio.json.config.default_engine = engine
+    return engine
+
+
+def encode(value):
+    """Serialize ``value`` the way Dash serializes callback responses."""
+    return pio.json.to_json_plotly(value)
+
+
+class ResponseCache:
+    """Bounded LRU of serialized callback responses, keyed by output and input values.
+
+    Only callbacks whose response is a pure function of their inputs and of
+    the data whose version ``version()`` returns should be registered. Cached
+    answers are recorded in the metrics under ``name``.
+    """
+
+    def __init__(self, maxsize=32, version=None, name="cached"):
+        self.maxsize = maxsize
+        self.version = version
+        self.name = name
+        self.outputs = set()  # Dash "output" strings of the cached callbacks
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, outputs):
+        """Cache the responses of the callback with these ``Output`` dependencies."""
+        ids = ["%s.%s" % (output.component_id, output.component_property) for output in outputs]
+        self.outputs.add("..%s.." % "...".join(ids))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def install(self, server, update_path):
+        """Answer repeated requests of the registered callbacks on ``server`` from the cache."""
+
+        @server.before_request
+        def cached_response():
+            key = self._key(update_path)
+            if key is None:
+                return None
+            with self._lock:
+                body = self._entries.get(key)
+                if body is not None:
+                    self._entries.move_to_end(key)
+            if body is None:
+                flask.g.response_cache_key = key
+                return None
+            metrics.label(self.name, cached=True)
+            return flask.Response(body, mimetype="application/json")
+
+        @server.after_request
+        def store_response(response):
+            key = flask.g.pop("response_cache_key", None)
+            if key is not None and response.status_code == 200:
+                body = response.get_data()
+                with self._lock:
+                    self._entries[key] = body
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            return response
+
+    def _key(self, update_path):
+        request = flask.request
+        if request.method != "POST" or request.path != update_path:
+            return None
+        payload = request.get_json(silent=True) or {}
+        if payload.get("output") not in self.outputs:
+            return None
+        inputs = [(i.get("id"), i.get("property"), i.get("value")) for i in payload.get("inputs", [])]
+        version = self.version() if self.version is not None else None
+        return version, payload["output"], json.dumps(inputs, sort_keys=True)
@@ -0,0 +1,156 @@
+# Hot-reloadable data snapshots
+#
+# Everything a callback reads from the data files is built into one immutable
+# snapshot object. A holder keeps a reference to the current snapshot, and a
+# background watcher rebuilds a new one when a source file changes and swaps
+# the reference in a single assignment. Callbacks read ``holder.current`` once
+# per request without taking a lock, so they always see one consistent
+# snapshot, and a refresh never stops the workers from serving.
+import logging
+import os
+import threading
+import time
+
+from countries import country_codes
+from data_loader import load_aggregates, load_wide, shared_arrays
+from data_store import SeriesCube, SeriesStore
+from rollups import RollupStore
+from trends import TrendTable
+
+RELOAD_INTERVAL = 60  # seconds between checks of the source files
+
+logger = logging.getLogger(__name__)
+
+
+class DataSnapshot:
+    """The World Bank indicator lookup stores of one version of the export.
+
+    The stores' arrays are memory maps shared by every worker on the host (see
+    ``data_loader.shared_arrays``); only the first worker to see a version of
+    the export builds them from the cleaned wide table.
+    """
+
+    def __init__(self, source):
+        stat = os.stat(source)
+        self.version = "%d-%d" % (stat.st_size, stat.st_mtime_ns)  # keys caches of derived figures
+        arrays, meta = shared_arrays(source, "indicators", lambda: build_indicator_arrays(source))
+        self.series_store = SeriesStore.from_export(
+            _unprefixed(arrays, "store."), meta["store"]
+        ) # (country, series) -> year values
+        self.series_cube = SeriesCube.from_export(
+            _unprefixed(arrays, "cube."), meta["cube"]
+        ) # series x country x year array
+        self.rollup_store = RollupStore(self.series_cube, load_aggregates(source)) # regions and groups
+        self.trend_table = TrendTable(self.series_cube) # growth, trend and rank per (series, country)
+        self.available_country = meta["countries"]
+        self.country_codes = meta["codes"] # country name -> ISO-3 code
+
+
+def build_indicator_arrays(source):
+    """Arrays and metadata of the indicator stores, built from the cleaned wide table."""
+    df_wide = load_wide(source) # one row per (country, series), one float64 column per year
+    store_arrays, store_meta = SeriesStore(df_wide).export()
+    cube_arrays, cube_meta = SeriesCube(df_wide).export()
+    arrays = {"store.%s" % name: array for name, array in store_arrays.items()}
+    arrays.update({"cube.%s" % name: array for name, array in cube_arrays.items()})
+    meta = {
+        "store": store_meta,
+        "cube": cube_meta,
+        "countries": [str(country) for country in df_wide["Country Name"].unique()],
+        "codes": country_codes(df_wide),
+    }
+    return arrays, meta
+
+
+def _unprefixed(arrays, prefix):
+    return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
+
+class SnapshotHolder:
+    """Current snapshot built from ``sources``, rebuilt and swapped when they change.
+
+    ``build()`` returns a new snapshot; ``on_swap(snapshot)`` is called after
+    each swap, e.g. to drop caches of the previous one. With ``lazy`` the first
+    snapshot is only built by the first ``get()``.
+    """
+
+    def __init__(self, build, sources, lazy=False, on_swap=None):
+        self.sources = list(sources)
+        self.version = None
+        self.current = None
+        self._build = build
+        self._on_swap = on_swap
+        self._pending = None  # signature seen changed on the previous refresh
+        self._failed = None  # signature whose build raised
+        self._lock = threading.Lock()  # serializes builds, never taken by readers
+        if not lazy:
+            self.get()
+
+    def get(self):
+        """Return the current snapshot, building the first one if needed."""
+        snapshot = self.current
+        if snapshot is None:
+            with self._lock:
+                if self.current is None:
+                    self._swap(self._signature())
+                snapshot = self.current
+        return snapshot
+
+    def refresh(self):
+        """Rebuild and swap in a new snapshot if a source changed; True if it did.
+
+        A change is only picked up once the files look the same on two calls in
+        a row, so a file that is still being written is not read half way, and
+        a version that failed to build is not retried until it changes again.
+        """
+        with self._lock:
+            if self.current is None:
+                return False  # nothing loaded yet, the first get() reads the new files
+            signature = self._signature()
+            if signature in (self.version, self._failed):
+                return False
+            if signature != self._pending:
+                self._pending = signature  # wait for the writes to settle
+                return False
+            try:
+                self._swap(signature)
+            except Exception:
+                self._failed = signature
+                raise
+            return True
+
+    def _swap(self, signature):
+        # the signature is taken before the build, so a change made while
+        # building is picked up by the next refresh
+        snapshot = self._build()
+        self.current, self.version = snapshot, signature  # the atomic swap
+        if self._on_swap is not None:
+            self._on_swap(snapshot)
+
+    def _signature(self):
+        signature = []
+        for source in self.sources:
+            try:
+                stat = os.stat(source)
+            except OSError:
+                signature.append(None)
+            else:
+                signature.append("%d-%d" % (stat.st_size, stat.st_mtime_ns))
+        return "/".join(str(part) for part in signature)
+
+
+def watch(holders, interval=RELOAD_INTERVAL):
+    """Start a daemon thread that refreshes ``holders`` every ``interval`` seconds."""
+
+    def run():
+        while True:
+            time.sleep(interval)
+            for holder in holders:
+                try:
+                    holder.refresh()
+                except Exception:  # keep serving the current snapshot
+                    logger.exception("refreshing the snapshot of %s failed", ", ".join(holder.sources))
+
+    thread = threading.Thread(target=run, name="snapshot-watcher", daemon=True)
+    thread.start()
+    return thread
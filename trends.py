@@ -0,0 +1,144 @@
+# Cross-country trend and ranking table of every World Bank indicator
+#
+# The table is computed from the (series, country, year) cube in one pass of
+# array reductions over the year axis, with no loop over countries or series:
+# for every (series, country) it holds the latest value and its year, the
+# compound annual growth rate between the first and the latest value, the
+# least-squares change per decade, the trailing ROLLING_YEARS mean ending at
+# the latest value, and the country's rank by latest value (tied values share
+# a rank). The order of the countries by every column is sorted once as well,
+# so a top or bottom N leaderboard is a slice of a precomputed index.
+import numpy as np
+
+ROLLING_YEARS = 5  # window of the trailing mean
+
+# Columns of the table: name -> label
+COLUMNS = {
+    "latest": "Latest value",
+    "latest_year": "Year",
+    "cagr": "CAGR (%)",
+    "decade_change": "Change per decade",
+    "rolling_mean": "%d-year mean" % ROLLING_YEARS,
+    "rank": "Rank",
+}
+RANKED = ["latest", "cagr", "decade_change", "rolling_mean"]  # columns a leaderboard orders by
+
+
+def rolling_means(values, window=ROLLING_YEARS):
+    """Trailing ``window``-year means along the last axis of ``values``, ignoring NaN.
+
+    A year whose window holds no value is NaN.
+    """
+    present = ~np.isnan(values)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]  # a zero before the first year
+    sums = np.pad(np.cumsum(np.where(present, values, 0.0), axis=-1), pad)
+    counts = np.pad(np.cumsum(present, axis=-1), pad)
+    start = np.maximum(np.arange(1, values.shape[-1] + 1) - window, 0)  # first years are shorter
+    window_sums = sums[..., 1:] - sums[..., start]
+    window_counts = counts[..., 1:] - counts[..., start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+
+class TrendTable:
+    """Latest value, growth, trend, trailing mean and rank of every (series, country).
+
+    Each column is a (series, country) array aligned with ``self.series`` and
+    ``self.countries``; countries without data for a series are NaN.
+    """
+
+    def __init__(self, cube):
+        self.series = list(cube.series)
+        self.countries = list(cube.countries)
+        self.years = np.asarray(cube.years)
+        values = np.asarray(cube.values)[:, : len(self.countries)]  # without the unknown-name row
+        self._series_index = {name: i for i, name in enumerate(self.series)}
+        self.columns = trend_columns(values, self.years)
+
+        # ascending order of the countries by each ranked column, NaN last
+        self._order = {}
+        self._valid = {}
+        for name in RANKED:
+            column = self.columns[name]
+            self._order[name] = np.argsort(
+                np.where(np.isnan(column), np.inf, column), axis=1, kind="stable"
+            )
+            self._valid[name] = np.count_nonzero(~np.isnan(column), axis=1)
+
+        self.columns["rank"] = competition_rank(
+            self.columns["latest"], self._order["latest"], self._valid["latest"]
+        )
+
+    def leaderboard(self, series, by="latest", n=10, bottom=False):
+        """Rows of the top (or ``bottom``) ``n`` countries of ``series`` ordered by column ``by``.
+
+        Each row is a dict of the country name and every column; countries
+        without a value in ``by`` are left out. An unknown series has no rows.
+        """
+        row = self._series_index.get(series)
+        if row is None:
+            return []
+        order = self._order[by][row, : self._valid[by][row]]
+        selected = order[:n] if bottom else order[::-1][:n]
+        rows = {"country": [self.countries[i] for i in selected]}
+        for name, column in self.columns.items():
+            rows[name] = [None if np.isnan(v) else v.item() for v in column[row, selected]]
+        return [dict(zip(rows, values)) for values in zip(*rows.values())]
+
+
+def competition_rank(column, order, valid):
+    """Rank of every value of a (series, country) column within its series, 1 for the highest.
+
+    ``order`` is the ascending order of each row with NaN last and ``valid``
+    the number of values per row. Tied values share the best rank of their
+    group (1, 2, 2, 4), and NaN values have no rank.
+    """
+    ordered = np.take_along_axis(np.where(np.isnan(column), np.inf, column), order, axis=1)
+    # position of the last value of each run of equal values, in ascending order
+    last = np.ones(ordered.shape, dtype=bool)
+    last[:, :-1] = ordered[:, 1:] != ordered[:, :-1]
+    ends = np.where(last, np.arange(ordered.shape[1]), ordered.shape[1])
+    ends = np.minimum.accumulate(ends[:, ::-1], axis=1)[:, ::-1]
+    rank = np.empty(column.shape)
+    np.put_along_axis(rank, order, (valid[:, np.newaxis] - ends).astype(np.float64), axis=1)
+    rank[np.isnan(column)] = np.nan
+    return rank
+
+
+def trend_columns(values, years):
+    """Every column of the table except the rank, from a (series, country, year) array."""
+    present = ~np.isnan(values)
+    has_data = present.any(axis=-1)
+    first = np.argmax(present, axis=-1)
+    last = values.shape[-1] - 1 - np.argmax(present[..., ::-1], axis=-1)
+
+    def at(array, index):
+        taken = np.take_along_axis(array, index[..., np.newaxis], axis=-1)[..., 0]
+        return np.where(has_data, taken, np.nan)
+
+    latest = at(values, last)
+    first_value = at(values, first)
+    span = np.where(has_data, years[last] - years[first], 0)
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        growth = (latest / first_value) ** (1.0 / span) - 1
+    cagr = np.where((span > 0) & (first_value > 0) & (latest > 0), growth * 100, np.nan)
+
+    # least-squares slope over the years with data, on centred years for precision
+    x = np.where(present, years - years.mean(), 0.0)
+    y = np.where(present, values, 0.0)
+    n = present.sum(axis=-1)
+    sx, sy = x.sum(axis=-1), y.sum(axis=-1)
+    sxx, sxy = (x * x).sum(axis=-1), (x * y).sum(axis=-1)
+    denominator = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / denominator
+    decade_change = np.where((n >= 2) & (denominator > 0), slope * 10, np.nan)
+
+    return {
+        "latest": latest,
+        "latest_year": np.where(has_data, years[last], np.nan),
+        "cagr": cagr,
+        "decade_change": decade_change,
+        "rolling_mean": at(rolling_means(values), last),
+    }